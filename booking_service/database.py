@@ -1,16 +1,63 @@
-from supabase import create_client, Client
+from typing import Any, Callable, Optional
+import httpx
+from postgrest.exceptions import APIError
+from supabase import create_client, Client, ClientOptions
 from common.config import settings
 from common.logger import logger
+from common.resilience import get_breaker, DependencyUnavailableError
 
 url: str = settings.SUPABASE_URL
 key: str = settings.SUPABASE_KEY
 
+# Every Supabase call shares one breaker; its timeout is the per-request deadline
+db_breaker = get_breaker("supabase")
+
 if not url or not key:
     logger.critical("SUPABASE_URL or SUPABASE_KEY missing in settings!")
 
 try:
-    supabase: Client = create_client(url, key)
+    supabase: Client = create_client(
+        url,
+        key,
+        options=ClientOptions(postgrest_client_timeout=db_breaker.timeout)
+    )
     logger.info("Supabase client initialized successfully.")
 except Exception as e:
     logger.exception(f"Failed to initialize Supabase client: {e}")
     raise e
+
+
+# SQLSTATE classes (and PostgREST connection codes) that mean the database itself is in trouble
+_TRANSIENT_CODE_PREFIXES = ("08", "53", "57", "58", "XX", "PGRST0")
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    True for timeouts, connection errors and server-side (5xx) failures.
+    Request errors (constraint violations, bad UUIDs, ...) are not transient
+    and must not open the breaker for everyone else.
+    """
+    if isinstance(error, (httpx.TransportError, TimeoutError)):
+        return True
+    if isinstance(error, APIError):
+        code = str(error.code or "")
+        # Non-JSON error bodies carry the HTTP status as the code
+        return code.startswith(_TRANSIENT_CODE_PREFIXES) or (len(code) == 3 and code.startswith("5"))
+    return False
+
+
+def execute(query, fallback: Optional[Callable[[], Any]] = None):
+    """
+    Executes a Supabase query builder through the circuit breaker.
+    Fails fast while Supabase is unhealthy; returns `fallback()` if given.
+    Raises DependencyUnavailableError (503) for transient failures and
+    re-raises request errors unchanged.
+    """
+    try:
+        return db_breaker.call(query.execute, fallback=fallback, is_failure=is_transient)
+    except DependencyUnavailableError:
+        raise
+    except Exception as e:
+        if is_transient(e):
+            raise DependencyUnavailableError(f"Supabase unavailable: {e}") from e
+        raise
@@ -1,12 +1,23 @@
 from fastapi import FastAPI
 from booking_service.routers import bookings
+from booking_service.services.persistence import persistence
+from booking_service.services import admission
 from common.logger import logger
+from common.profiling import install_profiling
+from common import resilience
 
 app = FastAPI(title="Sleeper Bus Booking Service")
+install_profiling(app, service="booking-service")
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("Booking Service Starting...")
+    # Warm the seat inventory from the last snapshot + WAL
+    persistence.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    persistence.stop()
 
 # Include Routers
 app.include_router(bookings.router, prefix="/api/v1", tags=["bookings"])
@@ -16,6 +27,11 @@ def read_root():
     logger.debug("Health check probe")
     return {"status": "Booking Service Running", "version": "1.0.0"}
 
+@app.get("/metrics")
+def read_metrics():
+    """Circuit breaker state, hedge counts, dependency latency and admission queues."""
+    return {"resilience": resilience.stats(), "admission": admission.stats()}
+
 @app.on_event("startup")
 def print_routes():
     import logging
@@ -1,23 +1,73 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from typing import List
 from datetime import date
 from pydantic import UUID4
-from booking_service.schemas import Station, Seat, Meal, BookingRequest, BookingResponse
+from booking_service.schemas import (
+    Station, Seat, Meal, BookingRequest, BookingResponse, OccupancyResponse, WaitlistRequest, WaitlistResponse
+)
 from booking_service.services.booking_logic import BookingService
+from booking_service.services.admission import (
+    AdmissionController, AdmissionRejected, read_admission, write_admission, is_high_demand_cached
+)
 from common.logger import logger
+from common.resilience import DependencyUnavailableError
 router = APIRouter()
 
-@router.get("/stations", response_model=List[Station])
+# --- Admission Control ---
+async def _acquire(controller: AdmissionController, key=None, high_demand=None) -> float:
+    try:
+        return await controller.acquire(key, high_demand)
+    except AdmissionRejected as e:
+        logger.warning(f"Shed request: {e.detail}")
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+async def admit_read():
+    admitted_at = await _acquire(read_admission)
+    try:
+        yield
+    finally:
+        read_admission.release(admitted_at)
+
+async def admit_write():
+    admitted_at = await _acquire(write_admission)
+    try:
+        yield
+    finally:
+        write_admission.release(admitted_at)
+
+async def admit_booking(request: Request):
+    """
+    Queues bookings fairly per (date, segment). The body is already read by
+    FastAPI at this point, so parsing it here is free; invalid bodies are left
+    for the endpoint's validation to reject. Demand is only looked up if the
+    booking has to queue behind a long backlog for the same key.
+    """
+    key, high_demand = None, None
+    try:
+        body = await request.json()
+        travel_date = date.fromisoformat(body["travel_date"])
+        key = (travel_date, body["start_station_id"], body["end_station_id"])
+        high_demand = lambda: is_high_demand_cached(*key)
+    except (ValueError, KeyError, TypeError):
+        pass
+
+    admitted_at = await _acquire(write_admission, key, high_demand)
+    try:
+        yield
+    finally:
+        write_admission.release(admitted_at)
+
+@router.get("/stations", response_model=List[Station], dependencies=[Depends(admit_read)])
 def get_stations():
     logger.debug("Fetching stations")
     return BookingService.get_stations()
 
-@router.get("/meals", response_model=List[Meal])
+@router.get("/meals", response_model=List[Meal], dependencies=[Depends(admit_read)])
 def get_meals():
     logger.debug("Fetching meals")
     return BookingService.get_meals()
 
-@router.get("/bookings", response_model=List[BookingResponse])
+@router.get("/bookings", response_model=List[BookingResponse], dependencies=[Depends(admit_read)])
 def get_bookings():
     bookings_data = BookingService.get_bookings()
     
@@ -31,7 +81,7 @@ def get_bookings():
         ) for b in bookings_data
     ]
     
-@router.get("/seats", response_model=List[Seat])
+@router.get("/seats", response_model=List[Seat], dependencies=[Depends(admit_read)])
 def get_seats(
     from_station: UUID4, 
     to_station: UUID4, 
@@ -40,14 +90,28 @@ def get_seats(
     try:
         logger.info(f"Checking seats: {from_station} -> {to_station} on {travel_date}")
         return BookingService.get_available_seats(from_station, to_station, travel_date)
+    except DependencyUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching seats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/book", response_model=BookingResponse)
+@router.get("/occupancy", response_model=OccupancyResponse, dependencies=[Depends(admit_read)])
+def get_occupancy(travel_date: date):
+    try:
+        return BookingService.get_occupancy(travel_date)
+    except DependencyUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error fetching occupancy: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/book", response_model=BookingResponse, dependencies=[Depends(admit_booking)])
 def create_booking(booking: BookingRequest):
     try:
         return BookingService.create_booking(booking)
+    except DependencyUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except ValueError as e:
         if "available" in str(e):
             raise HTTPException(status_code=409, detail=str(e))
@@ -55,17 +119,41 @@ def create_booking(booking: BookingRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/cancel/{booking_id}")
+@router.post("/cancel/{booking_id}", dependencies=[Depends(admit_write)])
 def cancel_booking(booking_id: UUID4):
     try:
         BookingService.cancel_booking(booking_id)
         return {"message": "Booking cancelled successfully"}
+    except DependencyUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except ValueError as e:
+        if "already cancelled" in str(e):
+            raise HTTPException(status_code=409, detail=str(e))
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/bookings", response_model=List[BookingResponse]) # Adjust schema if needed
+@router.post("/waitlist", response_model=WaitlistResponse, dependencies=[Depends(admit_write)])
+def join_waitlist(request: WaitlistRequest):
+    try:
+        return BookingService.join_waitlist(request)
+    except DependencyUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        if "available" in str(e):
+            raise HTTPException(status_code=409, detail=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/waitlist/{waitlist_id}", response_model=WaitlistResponse, dependencies=[Depends(admit_read)])
+def get_waitlist_entry(waitlist_id: UUID4):
+    try:
+        return BookingService.get_waitlist_entry(waitlist_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/bookings", response_model=List[BookingResponse], dependencies=[Depends(admit_read)]) # Adjust schema if needed
 def get_all_bookings():
     """
     Fetch all bookings for the 'My Bookings' page.
@@ -30,4 +30,22 @@ class BookingResponse(BaseModel):
     booking_id: UUID4
     status: str
     message: str
-    total_amount: float
\ No newline at end of file
+    total_amount: float
+
+class OccupancyResponse(BaseModel):
+    travel_date: date
+    occupancy: float
+
+class WaitlistRequest(BaseModel):
+    start_station_id: UUID4
+    end_station_id: UUID4
+    travel_date: date
+    passenger_name: str = Field(..., min_length=1, description="Name of the passenger")
+    meal_ids: Optional[List[UUID4]] = []
+
+class WaitlistResponse(BaseModel):
+    waitlist_id: UUID4
+    status: str
+    message: str
+    position: Optional[int] = None
+    booking_id: Optional[UUID4] = None
@@ -0,0 +1,235 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from datetime import date
+from typing import Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from common.config import settings
+from common.logger import logger
+from common.resilience import get_breaker
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed. Maps to a 429/503 with Retry-After."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limit + bounded, fair queue for one endpoint class.
+
+    - Up to `limit` requests run at once; the rest wait in per-key FIFO
+      queues, served round-robin across keys so one hot (date, segment)
+      cannot starve the others.
+    - A full queue sheds immediately (429); a request that waits longer than
+      `queue_timeout` is shed (503). Both carry a Retry-After estimate.
+    - `limit` adapts (AIMD) to the Supabase latency measured by its breaker.
+
+    Must be used from a single event loop (one per worker).
+    """
+
+    def __init__(self, name: str, max_limit: int, min_limit: int, queue_size: int,
+                 queue_timeout: float, per_key_queue: int, target_latency_ms: float):
+        self.name = name
+        self.limit = max_limit
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.per_key_queue = per_key_queue
+        self.target_latency_ms = target_latency_ms
+
+        self.in_flight = 0
+        self.queued = 0
+        self._queues: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+        self._hold_ewma = 0.05
+        self._last_adapt = 0.0
+        self._db = get_breaker("supabase")
+
+        # --- Metrics ---
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_key_full = 0
+        self.shed_timeout = 0
+
+    def _retry_after(self) -> int:
+        # Time for the current backlog to drain at the current limit
+        seconds = (self.queued + 1) * self._hold_ewma / max(self.limit, 1)
+        return min(max(math.ceil(seconds), 1), 60)
+
+    def _backlog(self, key: Hashable) -> int:
+        queue = self._queues.get(key)
+        return len(queue) if queue is not None else 0
+
+    async def acquire(self, key: Hashable = None,
+                      high_demand: Optional[Callable[[], Awaitable[bool]]] = None) -> float:
+        """
+        Waits for a slot. Returns the admission time, to be passed to `release`.
+        `high_demand()` is only awaited when the key's backlog is already at
+        `per_key_queue`, so requests that are admitted straight away never pay for it.
+        """
+        if self.in_flight < self.limit and self.queued == 0:
+            return self._admit()
+
+        # High-demand dates may only take a bounded share of the shared queue
+        if high_demand is not None and self._backlog(key) >= self.per_key_queue:
+            is_high = await high_demand()
+            # Slots may have been released while the lookup ran
+            if self.in_flight < self.limit and self.queued == 0:
+                return self._admit()
+            if is_high and self._backlog(key) >= self.per_key_queue:
+                self.shed_key_full += 1
+                raise AdmissionRejected(429, "Too many pending requests for this date and route", self._retry_after())
+
+        if self.queued >= self.queue_size:
+            self.shed_queue_full += 1
+            raise AdmissionRejected(429, f"{self.name} queue is full", self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+        queue.append(waiter)
+        self.queued += 1
+
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was granted just as we gave up; hand it to the next waiter
+                self.release(time.monotonic())
+            self._discard(key, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.shed_timeout += 1
+                raise AdmissionRejected(503, f"{self.name} queue deadline exceeded", self._retry_after())
+            raise
+        return time.monotonic()
+
+    def _admit(self) -> float:
+        self.in_flight += 1
+        self.admitted += 1
+        return time.monotonic()
+
+    def _discard(self, key: Hashable, waiter: asyncio.Future):
+        queue = self._queues.get(key)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self.queued -= 1
+            if not queue:
+                del self._queues[key]
+
+    def release(self, admitted_at: float):
+        self.in_flight -= 1
+        hold = time.monotonic() - admitted_at
+        self._hold_ewma = 0.8 * self._hold_ewma + 0.2 * hold
+        self._adapt()
+        self._grant()
+
+    def _grant(self):
+        # Round-robin over keys, FIFO within a key
+        while self.in_flight < self.limit and self._queues:
+            key, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            if not waiter.done():
+                self._admit()
+                waiter.set_result(None)
+
+    def _adapt(self):
+        """Additive increase while Supabase is fast, multiplicative decrease when it is slow."""
+        now = time.monotonic()
+        if now - self._last_adapt < 1.0:
+            return
+        self._last_adapt = now
+
+        latency = self._db.latency_ewma_ms
+        if latency > self.target_latency_ms:
+            new_limit = max(self.min_limit, int(self.limit * 0.75))
+        elif latency < self.target_latency_ms / 2:
+            new_limit = min(self.max_limit, self.limit + 1)
+        else:
+            return
+
+        if new_limit != self.limit:
+            logger.info(f"Admission '{self.name}' limit {self.limit} -> {new_limit} (db latency {latency:.0f} ms)")
+            self.limit = new_limit
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queued,
+            "queued_keys": len(self._queues),
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_key_full": self.shed_key_full,
+            "shed_timeout": self.shed_timeout,
+        }
+
+
+def is_high_demand(travel_date: date, start_station_id: str, end_station_id: str) -> bool:
+    """
+    Asks the prediction engine whether a booking targets a "High" demand date.
+    Blocking (may hit Supabase or the prediction service); call from a worker thread.
+    """
+    from booking_service.services.inventory import inventory
+    from common.prediction_client import get_prediction_client
+
+    try:
+        start, end = inventory.segment(start_station_id, end_station_id)
+        occupancy = inventory.occupancy(travel_date)
+        prediction = get_prediction_client().predict(travel_date, start, end, occupancy)
+        return prediction.get("demand_level") == "High"
+    except Exception as e:
+        logger.debug(f"Demand lookup failed, treating as normal demand: {e}")
+        return False
+
+
+# (travel_date, start_station_id, end_station_id) -> (looked_up_at, is_high)
+_demand_cache: "OrderedDict[tuple, Tuple[float, bool]]" = OrderedDict()
+
+
+async def is_high_demand_cached(travel_date: date, start_station_id: str, end_station_id: str) -> bool:
+    """`is_high_demand` run in the threadpool, remembered per (date, segment) for a short TTL."""
+    key = (travel_date, start_station_id, end_station_id)
+    entry = _demand_cache.get(key)
+    if entry is not None and time.monotonic() - entry[0] < settings.ADMISSION_DEMAND_CACHE_TTL_SECONDS:
+        return entry[1]
+
+    is_high = await run_in_threadpool(is_high_demand, *key)
+    _demand_cache[key] = (time.monotonic(), is_high)
+    _demand_cache.move_to_end(key)
+    while len(_demand_cache) > settings.ADMISSION_DEMAND_CACHE_SIZE:
+        _demand_cache.popitem(last=False)
+    return is_high
+
+
+def _controller(name: str, max_limit: int) -> AdmissionController:
+    return AdmissionController(
+        name=name,
+        max_limit=max_limit,
+        min_limit=settings.ADMISSION_MIN_LIMIT,
+        queue_size=settings.ADMISSION_QUEUE_SIZE,
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+        per_key_queue=settings.ADMISSION_HIGH_DEMAND_KEY_QUEUE,
+        target_latency_ms=settings.ADMISSION_TARGET_DB_LATENCY_MS
+    )
+
+
+# Global Instances (one per endpoint class)
+read_admission = _controller("reads", settings.ADMISSION_READ_LIMIT)
+write_admission = _controller("writes", settings.ADMISSION_WRITE_LIMIT)
+
+
+def stats() -> Dict[str, Dict[str, float]]:
+    return {c.name: c.stats() for c in (read_admission, write_admission)}
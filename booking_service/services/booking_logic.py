@@ -1,20 +1,69 @@
 from datetime import date
 from typing import List, Optional
 from pydantic import UUID4
-from booking_service.database import supabase
-from booking_service.schemas import Station, Seat, Meal, BookingRequest, BookingResponse
+from booking_service.database import supabase, execute
+from booking_service.schemas import (
+    Station, Seat, Meal, BookingRequest, BookingResponse, OccupancyResponse, WaitlistRequest, WaitlistResponse
+)
+from booking_service.services.inventory import inventory
+from booking_service.services.waitlist import waitlist, WaitlistEntry
 from common.logger import logger
+from common.resilience import DependencyUnavailableError
+
+# Served when the meals table is empty or Supabase is unavailable
+DEFAULT_MEALS = [
+    {"id": "a0eebc99-9c0b-4ef8-bb6d-6bb9bd380a11", "name": "Veg Thali", "price": 150.0, "type": "veg"},
+    {"id": "b1eebc99-9c0b-4ef8-bb6d-6bb9bd380a22", "name": "Chicken Biryani", "price": 250.0, "type": "non-veg"}
+]
 
 class BookingService:
+    # Last successful stations response, served while Supabase's circuit is open
+    _last_stations: List[dict] = []
+
     @staticmethod
     def get_stations() -> List[Station]:
-        response = supabase.table("stations").select("*").order("sequence_order").execute()
+        try:
+            response = execute(supabase.table("stations").select("*").order("sequence_order"))
+        except Exception as e:
+            if not BookingService._last_stations:
+                raise
+            logger.warning(f"Could not fetch stations ({e}). Serving last-known stations.")
+            return BookingService._last_stations
+
+        BookingService._last_stations = response.data
         return response.data
 
     @staticmethod
-    def get_available_seats(from_station: UUID4, to_station: UUID4, travel_date: date) -> List[Seat]:
+    def get_available_seats(from_station: UUID4, to_station: UUID4, travel_date: date,
+                            strict: bool = False) -> List[Seat]:
+        """
+        Serves available seats from the in-process inventory cache.
+        Falls back to the Postgres RPC if the cache cannot be built.
+        With `strict`, a failing RPC raises instead of returning no seats.
+        """
+        try:
+            return inventory.available_seats(from_station, to_station, travel_date)
+        except (ValueError, DependencyUnavailableError):
+            # Bad input, or Supabase is down: the RPC would fail the same way
+            raise
+        except Exception as e:
+            logger.warning(f"Inventory unavailable ({e}). Falling back to RPC.")
+            return BookingService._query_available_seats(from_station, to_station, travel_date, strict)
+
+    @staticmethod
+    def get_occupancy(travel_date: date) -> OccupancyResponse:
+        """
+        Bookings per seat on a travel date, capped at 1. This is the prediction
+        model's `current_bus_occupancy`; every caller should score with this value.
+        """
+        return OccupancyResponse(travel_date=travel_date, occupancy=inventory.occupancy(travel_date))
+
+    @staticmethod
+    def _query_available_seats(from_station: UUID4, to_station: UUID4, travel_date: date,
+                               strict: bool = False) -> List[Seat]:
         """
         Fetches available seats using the Postgres RPC function 'get_available_seats'.
+        This is the authoritative check used right before a booking is written.
         """
         # --- FIXED PARAMETERS (Sends 3 args now) ---
         params = {
@@ -25,7 +74,7 @@ class BookingService:
         
         try:
             print(f"DEBUG: Calling 'get_available_seats' with params: {params}")
-            response = supabase.rpc("get_available_seats", params).execute()
+            response = execute(supabase.rpc("get_available_seats", params))
             
             seats = []
             for item in response.data:
@@ -36,33 +85,32 @@ class BookingService:
                 ))
             return seats
             
+        except DependencyUnavailableError:
+            # Fail fast (503) instead of reporting every seat as booked
+            raise
         except Exception as e:
             logger.error(f"Error checking availability: {e}")
+            if strict:
+                raise
             return []
 
     @staticmethod
     def get_meals():
         try:
-            response = supabase.table("meals").select("*").execute()
+            response = execute(supabase.table("meals").select("*"))
             if not response.data:
                 # Fallback if table is empty or missing
-                return [
-                    {"id": "a0eebc99-9c0b-4ef8-bb6d-6bb9bd380a11", "name": "Veg Thali", "price": 150.0, "type": "veg"},
-                    {"id": "b1eebc99-9c0b-4ef8-bb6d-6bb9bd380a22", "name": "Chicken Biryani", "price": 250.0, "type": "non-veg"}
-                ]
+                return DEFAULT_MEALS
             return response.data
         except Exception as e:
             logger.warning(f"Could not fetch meals ({e}). Returning mock data.")
-            return [
-                {"id": "a0eebc99-9c0b-4ef8-bb6d-6bb9bd380a11", "name": "Veg Thali", "price": 150.0, "type": "veg"},
-                {"id": "b1eebc99-9c0b-4ef8-bb6d-6bb9bd380a22", "name": "Chicken Biryani", "price": 250.0, "type": "non-veg"}
-            ]
+            return DEFAULT_MEALS
 
     @staticmethod
     def create_booking(booking: BookingRequest) -> BookingResponse:
         try:
-            # 1. Check Availability
-            available_seats = BookingService.get_available_seats(
+            # 1. Check Availability (against the DB, not the cache)
+            available_seats = BookingService._query_available_seats(
                 booking.start_station_id, 
                 booking.end_station_id, 
                 booking.travel_date
@@ -90,7 +138,7 @@ class BookingService:
             print(f"DEBUG: Inserting Booking: {booking_data}")
 
             # 3. Insert into Database
-            res = supabase.table("bookings").insert(booking_data).execute()
+            res = execute(supabase.table("bookings").insert(booking_data))
             
             if not res.data:
                  raise Exception("Database insert returned no data")
@@ -100,7 +148,16 @@ class BookingService:
             # 4. Insert Meals (Optional)
             if booking.meal_ids:
                 meal_inserts = [{"booking_id": new_booking_id, "meal_id": str(mid)} for mid in booking.meal_ids]
-                supabase.table("booking_meals").insert(meal_inserts).execute()
+                execute(supabase.table("booking_meals").insert(meal_inserts))
+
+            # 5. Update cached availability
+            inventory.record_booking(
+                new_booking_id,
+                booking.seat_id,
+                booking.start_station_id,
+                booking.end_station_id,
+                booking.travel_date
+            )
                 
             return BookingResponse(
                 booking_id=new_booking_id, 
@@ -121,8 +178,116 @@ class BookingService:
         """
         try:
             # Order by created_at descending (newest first)
-            response = supabase.table("bookings").select("*").order("created_at", desc=True).execute()
+            response = execute(supabase.table("bookings").select("*").order("created_at", desc=True))
             return response.data
         except Exception as e:
             logger.error(f"Error fetching bookings: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    @staticmethod
+    def cancel_booking(booking_id: UUID4):
+        """
+        Cancels a booking, frees its berth in the inventory cache and
+        offers the berth to the waitlist.
+        """
+        # 1. Flip the status, only if it is still confirmed (atomic in the DB,
+        #    so two concurrent cancels cannot both free and re-offer the berth)
+        res = execute(
+            supabase.table("bookings")
+            .update({"status": "CANCELLED"})
+            .eq("id", str(booking_id))
+            .eq("status", "CONFIRMED")
+        )
+        if not res.data:
+            # 2. Nothing updated: tell "missing" apart from "already cancelled"
+            existing = execute(supabase.table("bookings").select("id").eq("id", str(booking_id)))
+            if not existing.data:
+                raise ValueError(f"Booking {booking_id} not found.")
+            raise ValueError(f"Booking {booking_id} is already cancelled.")
+
+        booking = res.data[0]
+        logger.info(f"Booking {booking_id} cancelled")
+
+        # 3. Free the berth incrementally
+        travel_date = date.fromisoformat(booking['travel_date'])
+        inventory.release_booking(booking['id'], booking['seat_id'], travel_date)
+
+        # 4. Offer the freed berth to the waitlist
+        BookingService._promote_waitlist(booking['seat_id'], travel_date)
+
+    @staticmethod
+    def join_waitlist(request: WaitlistRequest) -> WaitlistResponse:
+        """
+        Adds a passenger to the waitlist of a fully-booked segment.
+        """
+        segment = inventory.segment(request.start_station_id, request.end_station_id)
+
+        # Only a real "no seats" answer may put someone on the waitlist
+        try:
+            available = BookingService.get_available_seats(
+                request.start_station_id,
+                request.end_station_id,
+                request.travel_date,
+                strict=True
+            )
+        except (ValueError, DependencyUnavailableError):
+            raise
+        except Exception as e:
+            raise DependencyUnavailableError(f"Could not check availability: {e}") from e
+
+        if available:
+            raise ValueError(f"{len(available)} seats are still available for this segment. Book directly.")
+
+        entry = waitlist.add(request, segment)
+        logger.info(f"Waitlisted {entry.waitlist_id} for {request.travel_date} segment {segment}")
+        return BookingService._waitlist_response(entry, "Added to waitlist")
+
+    @staticmethod
+    def get_waitlist_entry(waitlist_id: UUID4) -> WaitlistResponse:
+        entry = waitlist.get(str(waitlist_id))
+        if entry is None:
+            raise ValueError(f"Waitlist entry {waitlist_id} not found.")
+        return BookingService._waitlist_response(entry, "Retrieved")
+
+    @staticmethod
+    def _waitlist_response(entry: WaitlistEntry, message: str) -> WaitlistResponse:
+        return WaitlistResponse(
+            waitlist_id=entry.waitlist_id,
+            status=entry.status,
+            message=message,
+            position=waitlist.position(entry),
+            booking_id=entry.booking_id
+        )
+
+    @staticmethod
+    def _promote_waitlist(seat_id: str, travel_date: date):
+        """
+        Books the freed berth for the best-matching waiting passengers.
+        Repeats while the berth still has room (e.g. two shorter segments).
+        """
+        while True:
+            entry = waitlist.pop_best(
+                travel_date,
+                lambda start, end: inventory.is_seat_free(seat_id, travel_date, start, end)
+            )
+            if entry is None:
+                return
+
+            req = entry.request
+            try:
+                # Promotions go through the normal booking path
+                res = BookingService.create_booking(BookingRequest(
+                    seat_id=seat_id,
+                    start_station_id=req.start_station_id,
+                    end_station_id=req.end_station_id,
+                    travel_date=req.travel_date,
+                    passenger_name=req.passenger_name,
+                    meal_ids=req.meal_ids
+                ))
+            except Exception as e:
+                logger.warning(f"Could not promote waitlist entry {entry.waitlist_id}: {e}")
+                waitlist.requeue(entry)
+                return
+
+            waitlist.mark_promoted(entry, res.booking_id)
+            logger.info(f"Waitlist entry {entry.waitlist_id} promoted to booking {res.booking_id}")
@@ -0,0 +1,237 @@
+import threading
+import time
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from pydantic import UUID4
+from booking_service.database import supabase, execute
+from booking_service.schemas import Seat
+from common.config import settings
+from common.logger import logger
+
+
+class _DateOccupancy:
+    """
+    Occupancy of every seat for one travel date.
+    occupancy[seat_id][booking_id] = (start_order, end_order)
+    """
+    __slots__ = ("occupancy", "loaded_at")
+
+    def __init__(self, loaded_at: float):
+        self.occupancy: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        self.loaded_at = loaded_at
+
+
+class SeatInventory:
+    """
+    In-process cache of seat occupancy, kept per travel date.
+
+    Each date is loaded from Supabase once (and again after the TTL expires).
+    Bookings and cancellations are then applied as deltas, so a single
+    booking never invalidates the whole cache.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._seats: Dict[str, Seat] = {}
+        self._station_orders: Dict[str, int] = {}
+        self._dates: Dict[date, _DateOccupancy] = {}
+        # Deltas applied while a date is being (re)loaded, one list per in-flight load
+        self._reloads: Dict[date, List[List[tuple]]] = {}
+        # Optional write-ahead log; receives every delta applied to a cached date
+        self.journal = None
+
+    # --- Catalog (seats & stations rarely change) ---
+    def _ensure_catalog(self):
+        if self._seats and self._station_orders:
+            return
+
+        seats_res = execute(supabase.table("seats").select("id, seat_number, type").order("seat_number"))
+        stations_res = execute(supabase.table("stations").select("id, sequence_order"))
+
+        with self._lock:
+            self._seats = {
+                str(s['id']): Seat(id=s['id'], seat_number=s['seat_number'], type=s['type'])
+                for s in seats_res.data
+            }
+            self._station_orders = {str(s['id']): s['sequence_order'] for s in stations_res.data}
+        logger.info(f"Inventory catalog loaded: {len(self._seats)} seats, {len(self._station_orders)} stations")
+
+    def station_order(self, station_id: UUID4) -> int:
+        self._ensure_catalog()
+        order = self._station_orders.get(str(station_id))
+        if order is None:
+            raise ValueError(f"Unknown station {station_id}")
+        return order
+
+    def segment(self, from_station: UUID4, to_station: UUID4) -> Tuple[int, int]:
+        """Converts a pair of station IDs into a (start_order, end_order) segment."""
+        start, end = self.station_order(from_station), self.station_order(to_station)
+        if start >= end:
+            raise ValueError("Start station must come before end station")
+        return start, end
+
+    # --- Per-date occupancy ---
+    def _get_date(self, travel_date: date) -> _DateOccupancy:
+        with self._lock:
+            state = self._dates.get(travel_date)
+            if state and time.monotonic() - state.loaded_at < self.ttl_seconds:
+                return state
+
+        return self.reload_date(travel_date)
+
+    def reload_date(self, travel_date: date) -> _DateOccupancy:
+        """
+        Rebuilds one date's occupancy from the DB, replacing whatever is cached.
+        Bookings and cancellations applied while the query runs may be missing
+        from its result, so they are collected and re-applied on top of it.
+        """
+        self._ensure_catalog()
+
+        deltas: List[tuple] = []
+        with self._lock:
+            self._reloads.setdefault(travel_date, []).append(deltas)
+
+        try:
+            # Fetch outside the lock so one cold date doesn't block the others
+            res = execute(
+                supabase.table("bookings")
+                .select("id, seat_id, start_station_id, end_station_id")
+                .eq("travel_date", travel_date.isoformat())
+                .eq("status", "CONFIRMED")
+            )
+
+            state = _DateOccupancy(loaded_at=time.monotonic())
+            for b in res.data:
+                start = self._station_orders.get(str(b['start_station_id']))
+                end = self._station_orders.get(str(b['end_station_id']))
+                if start is None or end is None:
+                    continue
+                state.occupancy.setdefault(str(b['seat_id']), {})[str(b['id'])] = (start, end)
+
+            with self._lock:
+                # Both operations are idempotent, so deltas the query already saw are harmless
+                for booking_id, seat_id, segment in deltas:
+                    if segment is None:
+                        self._pop(state, booking_id, seat_id)
+                    else:
+                        state.occupancy.setdefault(seat_id, {})[booking_id] = segment
+                self._dates[travel_date] = state
+        finally:
+            with self._lock:
+                pending = [d for d in self._reloads.get(travel_date, []) if d is not deltas]
+                if pending:
+                    self._reloads[travel_date] = pending
+                else:
+                    self._reloads.pop(travel_date, None)
+
+        logger.debug(f"Inventory loaded {len(res.data)} bookings for {travel_date} (+{len(deltas)} concurrent deltas)")
+        return state
+
+    def _track(self, travel_date: date, booking_id: str, seat_id: str, segment: Optional[Tuple[int, int]]):
+        # segment=None records a release
+        for deltas in self._reloads.get(travel_date, ()):
+            deltas.append((booking_id, seat_id, segment))
+
+    @staticmethod
+    def _pop(state: _DateOccupancy, booking_id: str, seat_id: str) -> Optional[Tuple[int, int]]:
+        intervals = state.occupancy.get(seat_id, {})
+        freed = intervals.pop(booking_id, None)
+        if not intervals:
+            state.occupancy.pop(seat_id, None)
+        return freed
+
+    @staticmethod
+    def _overlaps(intervals: Dict[str, Tuple[int, int]], start: int, end: int) -> bool:
+        return any(s < end and start < e for s, e in intervals.values())
+
+    def available_seats(self, from_station: UUID4, to_station: UUID4, travel_date: date) -> List[Seat]:
+        start, end = self.segment(from_station, to_station)
+        state = self._get_date(travel_date)
+        with self._lock:
+            return [
+                seat for seat_id, seat in self._seats.items()
+                if not self._overlaps(state.occupancy.get(seat_id, {}), start, end)
+            ]
+
+    def is_seat_free(self, seat_id: str, travel_date: date, start: int, end: int) -> bool:
+        state = self._get_date(travel_date)
+        with self._lock:
+            return not self._overlaps(state.occupancy.get(str(seat_id), {}), start, end)
+
+    def occupancy(self, travel_date: date) -> float:
+        """Bookings on a travel date per seat, capped at 1 (the model's `current_bus_occupancy`)."""
+        state = self._get_date(travel_date)
+        with self._lock:
+            booked = sum(len(bookings) for bookings in state.occupancy.values())
+            return min(booked / max(len(self._seats), 1), 1.0)
+
+    def record_booking(self, booking_id: str, seat_id: UUID4, from_station: UUID4,
+                       to_station: UUID4, travel_date: date):
+        """Marks a seat as occupied for the booked segment."""
+        start, end = self.segment(from_station, to_station)
+        self.apply_booking(travel_date, str(booking_id), str(seat_id), start, end)
+
+    def apply_booking(self, travel_date: date, booking_id: str, seat_id: str, start: int, end: int):
+        with self._lock:
+            self._track(travel_date, booking_id, seat_id, (start, end))
+            state = self._dates.get(travel_date)
+            if state is None:
+                return  # Not cached yet; the next load will read it from the DB
+            state.occupancy.setdefault(seat_id, {})[booking_id] = (start, end)
+            if self.journal is not None:
+                self.journal.log_booking(travel_date, booking_id, seat_id, start, end)
+
+    def release_booking(self, booking_id: str, seat_id: UUID4, travel_date: date) -> Optional[Tuple[int, int]]:
+        """Frees the segment held by a booking. Returns the freed segment, if cached."""
+        return self.apply_release(travel_date, str(booking_id), str(seat_id))
+
+    def apply_release(self, travel_date: date, booking_id: str, seat_id: str) -> Optional[Tuple[int, int]]:
+        with self._lock:
+            self._track(travel_date, booking_id, seat_id, None)
+            state = self._dates.get(travel_date)
+            if state is None:
+                return None
+            freed = self._pop(state, booking_id, seat_id)
+            if freed is not None and self.journal is not None:
+                self.journal.log_release(travel_date, booking_id, seat_id)
+            return freed
+
+    # --- Persistence hooks (see persistence.py) ---
+    def export_state(self, since: Optional[date] = None):
+        """
+        Consistent copy of the catalog and occupancy (dates before `since` are skipped).
+        Must be called with the inventory lock held if the WAL is rotated at the same time.
+        """
+        with self._lock:
+            dates = {
+                d: {seat_id: dict(bookings) for seat_id, bookings in state.occupancy.items()}
+                for d, state in self._dates.items()
+                if since is None or d >= since
+            }
+            return dict(self._seats), dict(self._station_orders), dates
+
+    def import_state(self, seats: Dict[str, Seat], station_orders: Dict[str, int],
+                     dates: Dict[date, Dict[str, Dict[str, Tuple[int, int]]]]):
+        """Installs restored state; every date counts as freshly loaded."""
+        now = time.monotonic()
+        with self._lock:
+            self._seats = seats
+            self._station_orders = station_orders
+            self._dates = {}
+            for d, occupancy in dates.items():
+                state = _DateOccupancy(loaded_at=now)
+                state.occupancy = occupancy
+                self._dates[d] = state
+
+    @property
+    def lock(self) -> threading.RLock:
+        return self._lock
+
+    def cached_dates(self) -> List[date]:
+        with self._lock:
+            return list(self._dates)
+
+
+# Global Instance (shared by all requests in this worker)
+inventory = SeatInventory(ttl_seconds=settings.AVAILABILITY_CACHE_TTL_SECONDS)
@@ -0,0 +1,343 @@
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import uuid
+import zlib
+from datetime import date
+from typing import Dict, Optional, Tuple
+from booking_service.schemas import Seat
+from booking_service.services.inventory import SeatInventory, inventory
+from common.config import settings
+from common.logger import logger
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+# --- Snapshot format (little-endian) ---
+# header:  magic, format version, seat count, station count, date count
+# seat:    uuid(16) + len-prefixed seat_number + len-prefixed type
+# station: uuid(16) + sequence_order(u16)
+# date:    ordinal(i32) + booking count(u32), then per booking:
+#          booking uuid(16) + seat uuid(16) + start(u16) + end(u16)
+SNAPSHOT_MAGIC = b"SBSN"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<4sHIII")
+_STATION = struct.Struct("<16sH")
+_DATE = struct.Struct("<iI")
+_BOOKING = struct.Struct("<16s16sHH")
+
+# --- WAL record: op(B=booking, C=cancellation) + ordinal + booking + seat + start + end, then crc32 ---
+_RECORD = struct.Struct("<ci16s16sHH")
+_CRC = struct.Struct("<I")
+RECORD_SIZE = _RECORD.size + _CRC.size
+
+
+def _uuid_bytes(value: str) -> bytes:
+    return uuid.UUID(str(value)).bytes
+
+
+def _uuid_str(raw: bytes) -> str:
+    return str(uuid.UUID(bytes=raw))
+
+
+def _pack_str(value: str) -> bytes:
+    raw = value.encode("utf-8")[:255]
+    return bytes([len(raw)]) + raw
+
+
+class WriteAheadLog:
+    """
+    Append-only log of booking/cancellation deltas since the last snapshot.
+    Each record is fixed-size and checksummed, so a torn final write is
+    detected and ignored on replay. Records are flushed to the OS on every
+    append (safe across process crashes, not power loss).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "ab")
+
+    def _append(self, op: bytes, travel_date: date, booking_id: str, seat_id: str, start: int, end: int):
+        record = _RECORD.pack(op, travel_date.toordinal(), _uuid_bytes(booking_id), _uuid_bytes(seat_id), start, end)
+        self._file.write(record + _CRC.pack(zlib.crc32(record)))
+        self._file.flush()
+
+    def log_booking(self, travel_date: date, booking_id: str, seat_id: str, start: int, end: int):
+        self._append(b"B", travel_date, booking_id, seat_id, start, end)
+
+    def log_release(self, travel_date: date, booking_id: str, seat_id: str):
+        self._append(b"C", travel_date, booking_id, seat_id, 0, 0)
+
+    def rotate(self, rotated_path: str):
+        """
+        Moves the current log aside and starts an empty one. If a previous
+        rotated log is still there (its snapshot failed), the records are appended to it.
+        """
+        self._file.close()
+        if os.path.exists(rotated_path):
+            with open(self.path, "rb") as src, open(rotated_path, "ab") as dst:
+                dst.write(src.read())
+            os.remove(self.path)
+        else:
+            os.replace(self.path, rotated_path)
+        self._file = open(self.path, "ab")
+
+    def close(self):
+        self._file.close()
+
+    @staticmethod
+    def replay(path: str, inventory: SeatInventory) -> int:
+        """Applies every intact record in `path` to the inventory. Returns the number applied."""
+        if not os.path.exists(path):
+            return 0
+
+        applied = 0
+        with open(path, "rb") as f:
+            data = f.read()
+
+        for offset in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+            record = data[offset:offset + _RECORD.size]
+            (crc,) = _CRC.unpack_from(data, offset + _RECORD.size)
+            if zlib.crc32(record) != crc:
+                logger.warning(f"WAL {path} has a corrupt record at byte {offset}; stopping replay")
+                break
+
+            op, ordinal, booking_raw, seat_raw, start, end = _RECORD.unpack(record)
+            travel_date = date.fromordinal(ordinal)
+            if op == b"B":
+                inventory.apply_booking(travel_date, _uuid_str(booking_raw), _uuid_str(seat_raw), start, end)
+            else:
+                inventory.apply_release(travel_date, _uuid_str(booking_raw), _uuid_str(seat_raw))
+            applied += 1
+        return applied
+
+
+class StateDirLock:
+    """
+    Exclusive, non-blocking lock on a lock file, held for the life of the process.
+    The OS releases it if the process dies, so a crash never leaves it stale.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self) -> bool:
+        f = open(self.path, "a+b")
+        try:
+            if sys.platform == "win32":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        if sys.platform == "win32":
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+def write_snapshot(path: str, seats: Dict[str, Seat], station_orders: Dict[str, int],
+                   dates: Dict[date, Dict[str, Dict[str, Tuple[int, int]]]]):
+    """Writes a snapshot to a temp file and atomically replaces `path`."""
+    parts = [_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(seats), len(station_orders), len(dates))]
+
+    for seat_id, seat in seats.items():
+        parts.append(_uuid_bytes(seat_id) + _pack_str(seat.seat_number) + _pack_str(seat.type))
+    for station_id, order in station_orders.items():
+        parts.append(_STATION.pack(_uuid_bytes(station_id), order))
+    for travel_date, occupancy in dates.items():
+        bookings = [
+            (booking_id, seat_id, segment)
+            for seat_id, seat_bookings in occupancy.items()
+            for booking_id, segment in seat_bookings.items()
+        ]
+        parts.append(_DATE.pack(travel_date.toordinal(), len(bookings)))
+        for booking_id, seat_id, (start, end) in bookings:
+            parts.append(_BOOKING.pack(_uuid_bytes(booking_id), _uuid_bytes(seat_id), start, end))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"".join(parts))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str):
+    """Memory-maps a snapshot and decodes it into (seats, station_orders, dates)."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        magic, version, seat_count, station_count, date_count = _HEADER.unpack_from(buf, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot {path} ({magic!r} v{version})")
+        offset = _HEADER.size
+
+        def read_str(at: int) -> Tuple[str, int]:
+            length = buf[at]
+            return bytes(buf[at + 1:at + 1 + length]).decode("utf-8"), at + 1 + length
+
+        seats: Dict[str, Seat] = {}
+        for _ in range(seat_count):
+            seat_id = _uuid_str(bytes(buf[offset:offset + 16]))
+            seat_number, offset = read_str(offset + 16)
+            seat_type, offset = read_str(offset)
+            seats[seat_id] = Seat(id=seat_id, seat_number=seat_number, type=seat_type)
+
+        station_orders: Dict[str, int] = {}
+        for _ in range(station_count):
+            raw, order = _STATION.unpack_from(buf, offset)
+            station_orders[_uuid_str(raw)] = order
+            offset += _STATION.size
+
+        dates: Dict[date, Dict[str, Dict[str, Tuple[int, int]]]] = {}
+        for _ in range(date_count):
+            ordinal, count = _DATE.unpack_from(buf, offset)
+            offset += _DATE.size
+            occupancy: Dict[str, Dict[str, Tuple[int, int]]] = {}
+            for booking_raw, seat_raw, start, end in _BOOKING.iter_unpack(buf[offset:offset + count * _BOOKING.size]):
+                occupancy.setdefault(_uuid_str(seat_raw), {})[_uuid_str(booking_raw)] = (start, end)
+            offset += count * _BOOKING.size
+            dates[date.fromordinal(ordinal)] = occupancy
+
+    return seats, station_orders, dates
+
+
+class InventoryPersistence:
+    """
+    Keeps the booking service's inventory warm across restarts.
+
+    - Every `interval` seconds the occupancy of current and future dates is
+      written as a compact binary snapshot, and the WAL is rotated.
+    - On startup the snapshot is memory-mapped, the WAL(s) replayed, and the
+      restored dates are reconciled with Supabase in a background thread.
+
+    Files live in `STATE_DIR` and have a single writer: the first worker to
+    lock the directory. Other workers (e.g. `uvicorn --workers N`) restore from
+    the same files read-only and reconcile, but never journal or snapshot.
+    A record they miss mid-rotation or a torn WAL tail is corrected by reconcile.
+    """
+
+    def __init__(self, inventory: SeatInventory, state_dir: str, interval: float):
+        self.inventory = inventory
+        self.interval = interval
+        self.snapshot_path = os.path.join(state_dir, f"{settings.SERVICE_NAME}.snapshot")
+        self.wal_path = os.path.join(state_dir, f"{settings.SERVICE_NAME}.wal")
+        self.rotated_wal_path = f"{self.wal_path}.old"
+        self.state_dir = state_dir
+        self.dir_lock = StateDirLock(os.path.join(state_dir, f"{settings.SERVICE_NAME}.lock"))
+        self.wal: Optional[WriteAheadLog] = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        owner = self.dir_lock.acquire()
+        restored = self.restore()
+
+        self._stop.clear()
+        if owner:
+            self.wal = WriteAheadLog(self.wal_path)
+            self.inventory.journal = self.wal
+            self._spawn(self._snapshot_loop, "inventory-snapshot")
+        else:
+            logger.info(f"{self.state_dir} is owned by another worker; restored read-only.")
+        if restored:
+            self._spawn(self._reconcile, "inventory-reconcile")
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.wal is not None:
+            self.snapshot()
+            self.inventory.journal = None
+            self.wal.close()
+            self.wal = None
+        self.dir_lock.release()
+
+    def _spawn(self, target, name: str):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def restore(self) -> bool:
+        """Loads snapshot + WAL into the inventory. Returns True if anything was restored."""
+        if not os.path.exists(self.snapshot_path):
+            logger.info("No inventory snapshot found; starting cold.")
+            return False
+
+        started = time.perf_counter()
+        try:
+            seats, station_orders, dates = read_snapshot(self.snapshot_path)
+        except Exception as e:
+            logger.error(f"Could not read inventory snapshot ({e}); starting cold.")
+            return False
+
+        self.inventory.import_state(seats, station_orders, dates)
+        replayed = sum(
+            WriteAheadLog.replay(path, self.inventory)
+            for path in (self.rotated_wal_path, self.wal_path)
+        )
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info(f"Inventory restored: {len(dates)} dates, {replayed} WAL records in {elapsed_ms:.1f} ms")
+        return True
+
+    def snapshot(self):
+        # Capture and rotate under the inventory lock so no delta falls between them
+        with self.inventory.lock:
+            seats, station_orders, dates = self.inventory.export_state(since=date.today())
+            if self.wal is not None:
+                self.wal.rotate(self.rotated_wal_path)
+
+        if not seats:
+            return  # Nothing has been loaded yet
+
+        write_snapshot(self.snapshot_path, seats, station_orders, dates)
+        # The rotated log is covered by the snapshot now
+        if os.path.exists(self.rotated_wal_path):
+            os.remove(self.rotated_wal_path)
+        logger.debug(f"Inventory snapshot written ({len(dates)} dates)")
+
+    def _snapshot_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.snapshot()
+            except Exception as e:
+                logger.error(f"Inventory snapshot failed: {e}")
+
+    def _reconcile(self):
+        """Re-reads every restored date from Supabase, one at a time, to correct any drift."""
+        for travel_date in self.inventory.cached_dates():
+            if self._stop.is_set():
+                return
+            try:
+                self.inventory.reload_date(travel_date)
+            except Exception as e:
+                logger.warning(f"Could not reconcile inventory for {travel_date}: {e}")
+        logger.info("Inventory reconciled with the database.")
+
+
+# Global Instance (started/stopped by booking_service.main)
+persistence = InventoryPersistence(
+    inventory,
+    state_dir=settings.STATE_DIR,
+    interval=settings.SNAPSHOT_INTERVAL_SECONDS
+)
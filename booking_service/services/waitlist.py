@@ -0,0 +1,134 @@
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+from booking_service.schemas import WaitlistRequest
+
+Segment = Tuple[int, int]
+
+
+class WaitlistEntry:
+    __slots__ = ("waitlist_id", "request", "segment", "enqueued_at", "seq", "status", "booking_id")
+
+    def __init__(self, request: WaitlistRequest, segment: Segment, seq: int):
+        self.waitlist_id = str(uuid.uuid4())
+        self.request = request
+        self.segment = segment
+        self.enqueued_at = time.time()
+        self.seq = seq
+        self.status = "WAITLISTED"
+        self.booking_id: Optional[str] = None
+
+    @property
+    def sort_key(self) -> Tuple[float, int]:
+        return (self.enqueued_at, self.seq)
+
+
+class Waitlist:
+    """
+    Priority queues of passengers waiting for a fully-booked segment.
+
+    One min-heap per (travel_date, segment), ordered by enqueue time, so the
+    head of each queue is read in O(1) and promoted in O(log n). Entries for
+    past travel dates are dropped once a day, on the next add or promotion.
+
+    The waitlist lives in this worker's memory only: it is lost on restart,
+    and a cancellation handled by another worker does not promote from it.
+    Run the booking service with a single worker while the waitlist is in use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues: Dict[date, Dict[Segment, List[Tuple[float, int, str]]]] = {}
+        self._entries: Dict[str, WaitlistEntry] = {}
+        self._seq = itertools.count()
+        self._pruned_on: Optional[date] = None
+
+    def _prune(self):
+        """Drops queues and entries whose travel date has passed. Call with the lock held."""
+        today = date.today()
+        if self._pruned_on == today:
+            return
+        self._pruned_on = today
+        for travel_date in [d for d in self._queues if d < today]:
+            del self._queues[travel_date]
+        self._entries = {
+            waitlist_id: entry for waitlist_id, entry in self._entries.items()
+            if entry.request.travel_date >= today
+        }
+
+    def add(self, request: WaitlistRequest, segment: Segment) -> WaitlistEntry:
+        with self._lock:
+            self._prune()
+            entry = WaitlistEntry(request, segment, next(self._seq))
+            self._entries[entry.waitlist_id] = entry
+            self._push(entry)
+            return entry
+
+    def requeue(self, entry: WaitlistEntry):
+        """Puts an entry back with its original priority (e.g. after a failed promotion)."""
+        with self._lock:
+            if entry.waitlist_id not in self._entries:
+                return  # Pruned while it was being promoted
+            entry.status = "WAITLISTED"
+            self._push(entry)
+
+    def _push(self, entry: WaitlistEntry):
+        heap = self._queues.setdefault(entry.request.travel_date, {}).setdefault(entry.segment, [])
+        heapq.heappush(heap, (*entry.sort_key, entry.waitlist_id))
+
+    def get(self, waitlist_id: str) -> Optional[WaitlistEntry]:
+        return self._entries.get(str(waitlist_id))
+
+    def position(self, entry: WaitlistEntry) -> Optional[int]:
+        """1-based position of an entry within its own queue."""
+        if entry.status != "WAITLISTED":
+            return None
+        with self._lock:
+            heap = self._queues.get(entry.request.travel_date, {}).get(entry.segment, [])
+            return 1 + sum(1 for item in heap if item[:2] < entry.sort_key)
+
+    def pop_best(self, travel_date: date, fits: Callable[[int, int], bool]) -> Optional[WaitlistEntry]:
+        """
+        Removes and returns the best waiting request that `fits` a freed berth.
+
+        Among all segments the berth can serve, the longest one wins (it uses
+        the most of the freed space); ties go to whoever has waited longest.
+        """
+        with self._lock:
+            self._prune()
+            segments = [seg for seg, heap in self._queues.get(travel_date, {}).items() if heap]
+
+        # `fits` may hit the DB, so evaluate it outside the lock
+        candidates = [seg for seg in segments if fits(*seg)]
+
+        with self._lock:
+            queues = self._queues.get(travel_date, {})
+            best = None
+            for seg in candidates:
+                heap = queues.get(seg)
+                if not heap:
+                    continue
+                rank = (seg[0] - seg[1], heap[0][0], heap[0][1])
+                if best is None or rank < best[0]:
+                    best = (rank, heap)
+
+            if best is None:
+                return None
+
+            _, _, waitlist_id = heapq.heappop(best[1])
+            entry = self._entries[waitlist_id]
+            entry.status = "PROMOTING"
+            return entry
+
+    def mark_promoted(self, entry: WaitlistEntry, booking_id: str):
+        with self._lock:
+            entry.status = "CONFIRMED"
+            entry.booking_id = str(booking_id)
+
+
+# Global Instance (shared by all requests in this worker)
+waitlist = Waitlist()
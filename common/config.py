@@ -1,4 +1,5 @@
 import os
+from typing import Dict
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -16,10 +17,66 @@ class Settings(BaseSettings):
     BOOKING_API_URL: str = Field(default="http://127.0.0.1:8000/api/v1")
     PREDICTION_API_URL: str = Field(default="http://127.0.0.1:8001")
 
+    # --- Prediction Client ---
+    # "inprocess" imports PredictionEngine directly (co-located deployments),
+    # "http" calls PREDICTION_API_URL
+    PREDICTION_TRANSPORT: str = Field(default="http")
+    PREDICTION_CACHE_SIZE: int = Field(default=256)
+    PREDICTION_CACHE_TTL_SECONDS: float = Field(default=60.0)
+    PREDICTION_POOL_SIZE: int = Field(default=10)
+
+    # --- Prediction Model ---
+    # How often the prediction engine checks MODEL_DIR for a newly published version
+    MODEL_POLL_INTERVAL_SECONDS: float = Field(default=30.0)
+
+    # --- Booking Service Cache ---
+    # How long a travel date's seat occupancy is served from memory before reloading
+    AVAILABILITY_CACHE_TTL_SECONDS: float = Field(default=30.0)
+    # Occupancy snapshot cadence; deltas in between go to the write-ahead log
+    SNAPSHOT_INTERVAL_SECONDS: float = Field(default=60.0)
+
+    # --- Admission Control (booking service) ---
+    # Ceilings on concurrent requests per endpoint class; lowered automatically
+    # while Supabase latency is above the target
+    ADMISSION_READ_LIMIT: int = Field(default=32)
+    ADMISSION_WRITE_LIMIT: int = Field(default=8)
+    ADMISSION_MIN_LIMIT: int = Field(default=2)
+    ADMISSION_TARGET_DB_LATENCY_MS: float = Field(default=250.0)
+    # Waiting requests beyond the limit; overflow gets a 429, a wait past the timeout a 503
+    ADMISSION_QUEUE_SIZE: int = Field(default=100)
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = Field(default=5.0)
+    # Max queued bookings for a single (date, segment) flagged as High demand
+    ADMISSION_HIGH_DEMAND_KEY_QUEUE: int = Field(default=20)
+    # How long a (date, segment) demand lookup is reused before asking the model again
+    ADMISSION_DEMAND_CACHE_TTL_SECONDS: float = Field(default=60.0)
+    ADMISSION_DEMAND_CACHE_SIZE: int = Field(default=512)
+
+    # --- Resilience (Timeouts, Circuit Breakers, Hedged Requests) ---
+    # Per-dependency deadlines in seconds, keyed by breaker name
+    DEFAULT_TIMEOUT_SECONDS: float = Field(default=5.0)
+    DEPENDENCY_TIMEOUTS: Dict[str, float] = Field(
+        default_factory=lambda: {"supabase": 5.0, "booking-api": 3.0, "prediction-api": 1.0}
+    )
+    BREAKER_FAILURE_THRESHOLD: int = Field(default=5)
+    BREAKER_RESET_SECONDS: float = Field(default=30.0)
+    # A second request is sent if an idempotent read hasn't answered within this delay
+    HEDGE_DELAY_SECONDS: float = Field(default=0.25)
+    HEDGE_MAX_WORKERS: int = Field(default=8)
+
+    # --- Request Profiling ---
+    # Profiling is off unless a token or a sample rate is set.
+    # Requests with header `X-Profile-Token: <token>` are always profiled.
+    PROFILING_TOKEN: str = Field(default="")
+    PROFILING_SAMPLE_RATE: float = Field(default=0.0)
+    PROFILING_INTERVAL_MS: float = Field(default=5.0)
+    PROFILING_MAX_FILES: int = Field(default=100)
+
     # --- Paths ---
     # Calculates root directory dynamically
     BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     LOG_DIR: str = os.path.join(BASE_DIR, "logs")
+    MODEL_DIR: str = os.path.join(BASE_DIR, "models")
+    STATE_DIR: str = os.path.join(BASE_DIR, "state")
 
     # --- Pydantic V2 Configuration ---
     model_config = SettingsConfigDict(
@@ -0,0 +1,147 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+from .config import settings
+from .logger import logger
+from .resilience import get_breaker
+
+
+class PredictionClient(ABC):
+    """
+    Single interface for demand predictions, whatever the transport.
+    Returns the same dict as `PredictionEngine.predict`.
+    """
+    transport = "base"
+
+    @abstractmethod
+    def predict(self, travel_date: date, start_station_order: int, end_station_order: int,
+                current_bus_occupancy: float = 0.0) -> dict:
+        ...
+
+
+class InProcessPredictionClient(PredictionClient):
+    """
+    Calls `PredictionEngine` directly. Used when the prediction logic is
+    co-located with the caller, so no network hop is paid.
+    """
+    transport = "inprocess"
+
+    def __init__(self):
+        # Imported lazily so HTTP-only deployments don't need the prediction package
+        from prediction_service.engine import PredictionEngine
+
+        self.engine = PredictionEngine()
+        self.engine.load_model()
+        self.engine.start_watching()
+
+    def predict(self, travel_date: date, start_station_order: int, end_station_order: int,
+                current_bus_occupancy: float = 0.0) -> dict:
+        return self.engine.predict(
+            travel_date=travel_date,
+            start_station_order=start_station_order,
+            end_station_order=end_station_order,
+            current_bus_occupancy=current_bus_occupancy
+        )
+
+
+class HttpPredictionClient(PredictionClient):
+    """
+    Calls the prediction service over HTTP with a pooled keep-alive session,
+    through the 'prediction-api' circuit breaker (hedged, since /predict is
+    idempotent). Results are kept in a small LRU cache; a stale entry is
+    served as the last-known prediction while the service is unavailable.
+    """
+    transport = "http"
+
+    def __init__(self, base_url: str, cache_size: int, cache_ttl: float, pool_size: int):
+        self.base_url = base_url
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.breaker = get_breaker("prediction-api")
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (stored_at, result)
+
+    def _post(self, payload: dict) -> dict:
+        res = self.session.post(f"{self.base_url}/predict", json=payload, timeout=self.breaker.timeout)
+        res.raise_for_status()
+        return res.json()
+
+    def _cached(self, key: tuple, allow_stale: bool = False) -> Optional[dict]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            stored_at, result = entry
+            if not allow_stale and time.monotonic() - stored_at > self.cache_ttl:
+                return None
+            self._cache.move_to_end(key)
+            return dict(result)
+
+    def _store(self, key: tuple, result: dict):
+        with self._lock:
+            self._cache[key] = (time.monotonic(), dict(result))
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def predict(self, travel_date: date, start_station_order: int, end_station_order: int,
+                current_bus_occupancy: float = 0.0) -> dict:
+        key = (travel_date.isoformat(), start_station_order, end_station_order, round(current_bus_occupancy, 2))
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        payload = {
+            "travel_date": travel_date.isoformat(),
+            "start_station_order": start_station_order,
+            "end_station_order": end_station_order,
+            "current_bus_occupancy": current_bus_occupancy
+        }
+        stale = self._cached(key, allow_stale=True)
+        result = self.breaker.call(
+            self._post, payload,
+            hedge=True,
+            fallback=(lambda: stale) if stale is not None else None
+        )
+        if result is not stale:
+            self._store(key, result)
+        return result
+
+
+_client: Optional[PredictionClient] = None
+_client_lock = threading.Lock()
+
+
+def get_prediction_client() -> PredictionClient:
+    """
+    Returns the process-wide prediction client.
+    The transport is chosen by `settings.PREDICTION_TRANSPORT` ("http" or "inprocess").
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            transport = settings.PREDICTION_TRANSPORT.lower()
+            if transport == "inprocess":
+                _client = InProcessPredictionClient()
+            elif transport == "http":
+                _client = HttpPredictionClient(
+                    base_url=settings.PREDICTION_API_URL,
+                    cache_size=settings.PREDICTION_CACHE_SIZE,
+                    cache_ttl=settings.PREDICTION_CACHE_TTL_SECONDS,
+                    pool_size=settings.PREDICTION_POOL_SIZE
+                )
+            else:
+                raise ValueError(f"Unknown PREDICTION_TRANSPORT '{settings.PREDICTION_TRANSPORT}'")
+            logger.info(f"Prediction client using '{_client.transport}' transport")
+        return _client
@@ -0,0 +1,271 @@
+import asyncio
+import functools
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from .config import settings
+from .logger import logger
+
+PROFILE_HEADER = b"x-profile-token"
+REQUEST_ID_HEADER = b"x-request-id"
+
+# Leaf frames of threads that are just parked (idle pool workers, event loop select)
+_IDLE_LEAVES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"), ("selectors.py", "select"),
+}
+
+# Profiler of the request being handled; copied into the worker thread of sync endpoints
+_active_profiler: ContextVar[Optional["SamplingProfiler"]] = ContextVar("active_profiler", default=None)
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler.
+
+    A background thread snapshots the stacks of the tracked threads each
+    `interval` seconds and counts identical stacks. The event-loop thread is
+    tracked from the start; FastAPI runs sync endpoints in a worker pool, so
+    the worker serving the request tracks itself while it runs the endpoint.
+    """
+
+    def __init__(self, interval: float, thread_ids: Optional[Set[int]] = None):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._thread_ids: Set[int] = set(thread_ids or ())
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def track(self, thread_id: int):
+        self._thread_ids.add(thread_id)
+
+    def untrack(self, thread_id: int):
+        self._thread_ids.discard(thread_id)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            frames = sys._current_frames()
+            for thread_id in list(self._thread_ids):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = self._collapse(frame)
+                if stack is None:
+                    continue
+                self.stacks[f"{names.get(thread_id, thread_id)};{stack}"] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _collapse(frame) -> Optional[str]:
+        code = frame.f_code
+        if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+            return None
+
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(frames))
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware that profiles selected requests.
+
+    A request is profiled if it carries `X-Profile-Token: <PROFILING_TOKEN>`
+    or falls into `PROFILING_SAMPLE_RATE`. The collapsed stacks (flame-graph
+    input for flamegraph.pl / speedscope) are written to
+    `LOG_DIR/profiles/<service>_<timestamp>_<request_id>.folded`.
+    Paths in `skip_paths` (the profile index itself) are never profiled.
+    """
+
+    def __init__(self, app, service: str, token: str, sample_rate: float, interval: float, output_dir: str,
+                 max_files: int, skip_paths: Tuple[str, ...] = ()):
+        self.app = app
+        self.service = service
+        self.skip_paths = set(skip_paths)
+        self.token = token.encode() if token else None
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.output_dir = output_dir
+        self.max_files = max_files
+
+    def _should_profile(self, headers: list) -> bool:
+        if self.token is not None:
+            for name, value in headers:
+                if name == PROFILE_HEADER:
+                    return value == self.token
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["path"] in self.skip_paths
+                or not self._should_profile(scope["headers"])):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = next(
+            (v.decode() for k, v in scope["headers"] if k == REQUEST_ID_HEADER),
+            uuid.uuid4().hex
+        )
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER, request_id.encode())]
+            await send(message)
+
+        # Sample the event loop plus whichever worker thread runs the endpoint
+        profiler = SamplingProfiler(self.interval, thread_ids={threading.get_ident()})
+        token = _active_profiler.set(profiler)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            stacks = profiler.stop()
+            _active_profiler.reset(token)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            # File I/O and pruning stay off the event loop
+            await run_in_threadpool(self._write, request_id, stacks)
+            logger.info(
+                f"Profiled {scope['method']} {scope['path']} [{request_id}] "
+                f"in {elapsed_ms:.1f} ms ({profiler.samples} samples)"
+            )
+
+    def _write(self, request_id: str, stacks: Counter):
+        # Keep the ID filesystem-safe, it comes from a client header
+        safe_id = "".join(c for c in request_id if c.isalnum() or c in "-_")[:64] or uuid.uuid4().hex
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.output_dir, f"{self.service}_{timestamp}_{safe_id}.folded")
+
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            self._prune()
+        except OSError as e:
+            logger.error(f"Could not write profile {path}: {e}")
+
+    def _prune(self):
+        for old in list_profiles(self.output_dir, self.service)[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.output_dir, old["file"]))
+            except OSError:
+                pass
+
+
+def list_profiles(output_dir: str, service: str) -> List[dict]:
+    """One service's profiles on disk, newest first (services may share `output_dir`)."""
+    if not os.path.isdir(output_dir):
+        return []
+
+    profiles = []
+    for name in os.listdir(output_dir):
+        if not name.endswith(".folded") or not name.startswith(f"{service}_"):
+            continue
+        stat = os.stat(os.path.join(output_dir, name))
+        profiles.append((stat.st_mtime, {
+            "file": name,
+            "request_id": name[:-len(".folded")].rsplit("_", 1)[-1],
+            "size_bytes": stat.st_size,
+            "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds"),
+        }))
+    return [p for _, p in sorted(profiles, key=lambda item: item[0], reverse=True)]
+
+
+def _tracked(endpoint):
+    """Wraps a sync endpoint so the worker thread running it is sampled."""
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profiler = _active_profiler.get()
+        if profiler is None:
+            return endpoint(*args, **kwargs)
+        thread_id = threading.get_ident()
+        profiler.track(thread_id)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profiler.untrack(thread_id)
+
+    wrapper.__profiling_tracked__ = True
+    return wrapper
+
+
+def _track_sync_endpoints(routes: list):
+    """
+    Wraps every sync endpoint, descending into included routers. Depending on
+    the FastAPI version a request calls either the route's prebuilt
+    `dependant.call` or a handler rebuilt from `route.endpoint`, so both are wrapped.
+    """
+    for route in routes:
+        included = getattr(route, "original_router", None)
+        if included is not None:
+            _track_sync_endpoints(included.routes)
+            continue
+
+        endpoint = getattr(route, "endpoint", None)
+        if endpoint is None or asyncio.iscoroutinefunction(endpoint):
+            continue
+        if not getattr(endpoint, "__profiling_tracked__", False):
+            route.endpoint = _tracked(endpoint)
+        dependant = getattr(route, "dependant", None)
+        if dependant is not None and not getattr(dependant.call, "__profiling_tracked__", False):
+            dependant.call = route.endpoint
+
+
+def install_profiling(app: FastAPI, service: str):
+    """
+    Adds the profiling middleware and the `/profiles` index to an app.
+    `service` prefixes the profile files, so each app only lists and prunes its own.
+    Nothing is installed unless PROFILING_TOKEN or PROFILING_SAMPLE_RATE is set,
+    so requests pay no overhead by default.
+    """
+    if not settings.PROFILING_TOKEN and settings.PROFILING_SAMPLE_RATE <= 0:
+        return
+
+    output_dir = os.path.join(settings.LOG_DIR, "profiles")
+    app.add_middleware(
+        ProfilingMiddleware,
+        service=service,
+        token=settings.PROFILING_TOKEN,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        interval=settings.PROFILING_INTERVAL_MS / 1000.0,
+        output_dir=output_dir,
+        max_files=settings.PROFILING_MAX_FILES,
+        skip_paths=("/profiles",)
+    )
+
+    # Routers are included after this call, so wrap their endpoints once the app starts
+    @app.on_event("startup")
+    def track_sync_endpoints():
+        _track_sync_endpoints(app.routes)
+
+    @app.get("/profiles", include_in_schema=False)
+    def get_profiles(x_profile_token: str = Header(default="")):
+        # Without a token (sampling-only) the index is open, like the rest of the service
+        if settings.PROFILING_TOKEN and x_profile_token != settings.PROFILING_TOKEN:
+            raise HTTPException(status_code=403, detail="Profiling token required")
+        return list_profiles(output_dir, service)[:settings.PROFILING_MAX_FILES]
+
+    logger.info(f"Request profiling enabled (sample rate {settings.PROFILING_SAMPLE_RATE})")
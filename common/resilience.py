@@ -0,0 +1,220 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Optional
+from .config import settings
+from .logger import logger
+
+
+class DependencyUnavailableError(Exception):
+    """A dependency timed out, could not be reached, or is failing server-side."""
+
+
+class CircuitOpenError(DependencyUnavailableError):
+    """Raised when a call is short-circuited and no fallback was given."""
+
+
+class CircuitBreaker:
+    """
+    Per-dependency circuit breaker.
+
+    - CLOSED: calls go through; consecutive failures are counted.
+    - OPEN: calls fail fast (fallback is served) until `reset_timeout` passes.
+    - HALF_OPEN: a single trial call decides whether to close or re-open.
+
+    `timeout` is the deadline callers should pass to the underlying client
+    (requests `timeout=`, Supabase client options, ...).
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, timeout: float, failure_threshold: int, reset_timeout: float,
+                 hedge_delay: float):
+        self.name = name
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.hedge_delay = hedge_delay
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._consecutive_failures = 0
+
+        # --- Metrics ---
+        self.calls = 0
+        self.failures = 0
+        self.short_circuits = 0
+        self.fallbacks = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.latency_ewma_ms = 0.0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def _allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.short_circuits += 1
+            return False
+
+    def _on_success(self, elapsed: float):
+        with self._lock:
+            self.calls += 1
+            self._observe(elapsed)
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit '{self.name}' closed")
+            self._state = self.CLOSED
+
+    def _on_failure(self, elapsed: float, error: Exception):
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self._observe(elapsed)
+            self._consecutive_failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuit '{self.name}' opened after: {error}")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def _observe(self, elapsed: float):
+        # Exponentially weighted moving average, alpha = 0.2
+        ms = elapsed * 1000.0
+        self.latency_ewma_ms = ms if self.calls == 1 else 0.8 * self.latency_ewma_ms + 0.2 * ms
+
+    def _fallback(self, fallback: Optional[Callable[[], Any]], error: Exception):
+        if fallback is None:
+            raise error
+        with self._lock:
+            self.fallbacks += 1
+        return fallback()
+
+    def call(self, fn: Callable[..., Any], *args, fallback: Optional[Callable[[], Any]] = None,
+             hedge: bool = False, is_failure: Optional[Callable[[Exception], bool]] = None, **kwargs) -> Any:
+        """
+        Runs `fn` through the breaker. If the circuit is open or the call fails,
+        `fallback()` is returned instead (or the error is raised if there is none).
+
+        `hedge=True` sends a second identical call if the first one has not
+        answered within `hedge_delay`. Only use it for idempotent reads.
+
+        `is_failure(error)` decides whether an error counts against the
+        dependency. Errors it rejects (e.g. a 4xx caused by the request itself)
+        are re-raised as-is without affecting the breaker.
+        """
+        if not self._allow():
+            return self._fallback(fallback, CircuitOpenError(f"Circuit '{self.name}' is open"))
+
+        start = time.monotonic()
+        try:
+            if hedge and self.hedge_delay > 0:
+                result = self._hedged(fn, *args, **kwargs)
+            else:
+                result = fn(*args, **kwargs)
+        except Exception as e:
+            if is_failure is not None and not is_failure(e):
+                # The dependency answered; the request itself was at fault
+                self._on_success(time.monotonic() - start)
+                raise
+            self._on_failure(time.monotonic() - start, e)
+            logger.warning(f"Call to '{self.name}' failed: {e}")
+            return self._fallback(fallback, e)
+
+        self._on_success(time.monotonic() - start)
+        return result
+
+    def _hedged(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        primary = _executor().submit(fn, *args, **kwargs)
+        done, _ = wait([primary], timeout=self.hedge_delay)
+        if done:
+            return primary.result()
+
+        with self._lock:
+            self.hedges += 1
+        backup = _executor().submit(fn, *args, **kwargs)
+        pending = {primary, backup}
+        error: Optional[BaseException] = None
+
+        # Return the first successful answer; the slower one is left to finish on its own
+        deadline = time.monotonic() + self.timeout
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"Hedged call to '{self.name}' exceeded {self.timeout}s")
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "timeout_s": self.timeout,
+            "calls": self.calls,
+            "failures": self.failures,
+            "short_circuits": self.short_circuits,
+            "fallbacks": self.fallbacks,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "latency_ewma_ms": round(self.latency_ewma_ms, 2),
+        }
+
+
+# --- Registry (one breaker per dependency, per process) ---
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _registry_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=settings.HEDGE_MAX_WORKERS, thread_name_prefix="hedge")
+        return _pool
+
+
+def get_breaker(name: str, timeout: Optional[float] = None) -> CircuitBreaker:
+    """
+    Returns the shared breaker for a dependency, creating it on first use.
+    `timeout` defaults to the deadline configured for that dependency.
+    """
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name=name,
+                timeout=timeout if timeout is not None else settings.DEPENDENCY_TIMEOUTS.get(name, settings.DEFAULT_TIMEOUT_SECONDS),
+                failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.BREAKER_RESET_SECONDS,
+                hedge_delay=settings.HEDGE_DELAY_SECONDS
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Breaker state, hedge counts and latency for every dependency seen so far."""
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.stats() for b in breakers}
@@ -11,10 +11,12 @@ import datetime
 import pandas as pd
 from common.config import settings
 from common.logger import logger
+from common.resilience import get_breaker, stats as resilience_stats
+from common.prediction_client import get_prediction_client
 
 # --- Configuration ---
 BOOKING_API_URL = settings.BOOKING_API_URL
-PREDICTION_API_URL = settings.PREDICTION_API_URL
+SEATS_PER_DECK = 10
 
 st.set_page_config(page_title="Sleeper Bus Booking", layout="wide")
 
@@ -25,53 +27,73 @@ if 'selected_seat_details' not in st.session_state:
     st.session_state.selected_seat_details = []
 
 # --- API Helper Functions ---
+# Every call has a deadline and goes through a per-service circuit breaker.
+# Idempotent reads are hedged; fallbacks serve the last successful response.
+booking_api = get_breaker("booking-api")
+prediction_client = get_prediction_client()
+
+@st.cache_resource
+def last_known():
+    """Last successful responses, kept across Streamlit reruns."""
+    return {}
+
+def fetch_json(method, url, breaker, **kwargs):
+    res = requests.request(method, url, timeout=breaker.timeout, **kwargs)
+    if res.status_code >= 500:
+        res.raise_for_status() # Counts as a failure for the breaker
+    return res.json() if res.status_code == 200 else None
+
 def get_stations():
     try:
-        return requests.get(f"{BOOKING_API_URL}/stations").json()
+        stations = booking_api.call(fetch_json, "GET", f"{BOOKING_API_URL}/stations", booking_api, hedge=True)
+        last_known()["stations"] = stations or []
+        return stations or []
     except:
-        return []
+        return last_known().get("stations", [])
 
 def get_meals():
     try:
-        return requests.get(f"{BOOKING_API_URL}/meals").json()
+        meals = booking_api.call(fetch_json, "GET", f"{BOOKING_API_URL}/meals", booking_api)
+        last_known()["meals"] = meals or []
+        return meals or []
     except:
-        return []
+        return last_known().get("meals", [])
 
+# Seats and bookings return None when the booking service is unavailable,
+# so the UI can tell an outage apart from "no seats" / "no bookings"
 def get_available_seats(from_id, to_id, date_str):
     try:
         params = {"from_station": from_id, "to_station": to_id, "travel_date": date_str}
-        res = requests.get(f"{BOOKING_API_URL}/seats", params=params)
-        return res.json() if res.status_code == 200 else []
+        return booking_api.call(fetch_json, "GET", f"{BOOKING_API_URL}/seats", booking_api, params=params, hedge=True)
     except:
-        return []
+        return None
+
+def get_occupancy(date_str):
+    """The date's occupancy as the booking service (and the model) define it, or None."""
+    try:
+        res = booking_api.call(fetch_json, "GET", f"{BOOKING_API_URL}/occupancy", booking_api,
+                               params={"travel_date": date_str}, hedge=True)
+        return res["occupancy"] if res else None
+    except:
+        return None
 
 def create_booking(payload):
     try:
-        return requests.post(f"{BOOKING_API_URL}/book", json=payload)
+        return booking_api.call(requests.post, f"{BOOKING_API_URL}/book", json=payload, timeout=booking_api.timeout)
     except Exception as e:
         return None
 
 def get_my_bookings():
     try:
-        res = requests.get(f"{BOOKING_API_URL}/bookings")
-        return res.json() if res.status_code == 200 else []
+        return booking_api.call(fetch_json, "GET", f"{BOOKING_API_URL}/bookings", booking_api)
     except:
-        return []
+        return None
 
 # --- ADDED: Prediction Helper Function ---
-def get_prediction(date_obj, start_order, end_order):
+def get_prediction(date_obj, start_order, end_order, occupancy):
     try:
-        payload = {
-            "travel_date": date_obj.isoformat(),
-            "start_station_order": start_order,
-            "end_station_order": end_order
-        }
-        # Note: Prediction service runs on port 8001
-        response = requests.post(f"{PREDICTION_API_URL}/predict", json=payload)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return {"confirmation_probability": 0, "demand_level": "Unknown"}
+        # In-process or HTTP (port 8001), depending on PREDICTION_TRANSPORT
+        return prediction_client.predict(date_obj, start_order, end_order, occupancy)
     except Exception as e:
         return {"confirmation_probability": 0, "demand_level": f"Error"}
 
@@ -104,6 +126,9 @@ def toggle_seat(seat_id, seat_number, deck_type, max_seats):
 st.sidebar.title("🚌 Sleeper Bus")
 page = st.sidebar.radio("Menu", ["Search & Book", "My Bookings"])
 
+with st.sidebar.expander("Service Health"):
+    st.json(resilience_stats())
+
 # --- PAGE 1: SEARCH & BOOK ---
 if page == "Search & Book":
     st.title("Plan Your Journey")
@@ -139,6 +164,9 @@ if page == "Search & Book":
             # Fetch real data
             seats = get_available_seats(start_node['id'], end_node['id'], t_date.isoformat())
             st.session_state.cached_available_seats = seats # Cache for UI stability
+            # Skip occupancy if the seat lookup already failed; the forecast then scores as empty
+            occupancy = get_occupancy(t_date.isoformat()) if seats is not None else None
+            st.session_state.cached_occupancy = occupancy if occupancy is not None else 0.0
             st.session_state.search_performed = True
             
             # Reset selection on new search
@@ -153,11 +181,15 @@ if page == "Search & Book":
             st.subheader("📊 Demand Forecast")
             
             # Call Prediction API
-            pred = get_prediction(t_date, start_node['sequence_order'], end_node['sequence_order'])
+            pred = get_prediction(
+                t_date, start_node['sequence_order'], end_node['sequence_order'],
+                st.session_state.cached_occupancy
+            )
             
             p1, p2 = st.columns(2)
             p1.metric("Booking Probability", f"{pred['confirmation_probability']}%")
             p2.metric("Demand Level", pred['demand_level'])
+            st.caption(f"Model: {pred.get('model_version', 'n/a')}")
             
             if pred['demand_level'] == "High":
                 st.warning("🔥 High Demand! Book fast.")
@@ -168,12 +200,14 @@ if page == "Search & Book":
             # ---------------------------------
 
             available_seats = st.session_state.cached_available_seats
-            available_count = len(available_seats)
+            available_count = len(available_seats) if available_seats is not None else 0
             
             st.divider()
             
             # --- CRITICAL CHECK: Do we have enough seats? ---
-            if available_count < num_passengers:
+            if available_seats is None:
+                st.error("⚠️ Booking service is unavailable. Could not load seats, please try again shortly.")
+            elif available_count < num_passengers:
                 st.error(f"❌ Not enough seats! You requested {num_passengers}, but only {available_count} are available.")
             else:
                 st.markdown(f"### 💺 Select Seats ({len(st.session_state.selected_seats)}/{num_passengers})")
@@ -188,7 +222,7 @@ if page == "Search & Book":
                 with col_lower:
                     st.markdown("#### Lower Deck")
                     cols = st.columns(5)
-                    for i in range(1, 11):
+                    for i in range(1, SEATS_PER_DECK + 1):
                         seat_num = f"L{i}"
                         s_id = avail_map.get(seat_num)
                         
@@ -207,7 +241,7 @@ if page == "Search & Book":
                 with col_upper:
                     st.markdown("#### Upper Deck")
                     cols = st.columns(5)
-                    for i in range(1, 11):
+                    for i in range(1, SEATS_PER_DECK + 1):
                         seat_num = f"U{i}"
                         s_id = avail_map.get(seat_num)
                         
@@ -286,7 +320,9 @@ elif page == "My Bookings":
     st.title("My Bookings")
     data = get_my_bookings()
     
-    if not data:
+    if data is None:
+        st.error("⚠️ Booking service is unavailable. Could not load your bookings, please try again shortly.")
+    elif not data:
         st.info("No bookings found.")
     else:
         # Create a nice dataframe
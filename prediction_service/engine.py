@@ -1,30 +1,141 @@
 import hashlib
+import os
+import threading
 from datetime import date
+from typing import Any, Optional, Tuple
+from common.config import settings
 from common.logger import logger
 
+# Feature schema shared with train_model.py (column order matters)
+FEATURE_COLUMNS = ['days_before_travel', 'is_weekend', 'segment_length', 'current_bus_occupancy']
+
+# Reported as `model_version` while no trained artifact has been published
+DETERMINISTIC_VERSION = "deterministic"
+
+
 class PredictionEngine:
-    def __init__(self, model_path: str = "model.pkl"):
-        # We are using a simulated deterministic model, so we don't load a physical file.
-        self.model_path = model_path
+    def __init__(self, model_dir: str = settings.MODEL_DIR):
+        # Versioned artifacts live in model_dir; LATEST names the active one
+        self.model_dir = model_dir
+        # (version, model) is swapped as one reference, so a request never sees a half-loaded model
+        self._active: Tuple[str, Optional[Any]] = (DETERMINISTIC_VERSION, None)
+        self._stop_watching = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
 
-    @staticmethod
-    def load_model():
-        logger.info("Deterministic Random Forest Simulator loaded successfully.")
+    @property
+    def model_version(self) -> str:
+        return self._active[0]
+
+    def load_model(self):
+        if not self.refresh() and self._active[1] is None:
+            logger.info("Deterministic Random Forest Simulator loaded successfully.")
+
+    def refresh(self) -> bool:
+        """
+        Loads the version named in LATEST if it differs from the active one.
+        Returns True if a new model was swapped in.
+        """
+        try:
+            with open(os.path.join(self.model_dir, "LATEST"), encoding="utf-8") as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return False
 
-    def predict(self, travel_date: date, start_station_order: int, end_station_order: int) -> dict:
+        if not version or version == self.model_version:
+            return False
+
+        try:
+            import joblib
+            model = joblib.load(os.path.join(self.model_dir, f"model-{version}.pkl"))
+            # Models published before training reset it may still predict on every core
+            if getattr(model, "n_jobs", None) not in (None, 1):
+                model.n_jobs = 1
+        except Exception as e:
+            logger.error(f"Could not load model {version}, keeping {self.model_version}: {e}")
+            return False
+
+        # Atomic swap: in-flight requests keep the tuple they already read
+        self._active = (version, model)
+        logger.info(f"Prediction model {version} loaded successfully.")
+        return True
+
+    def start_watching(self, interval: float = settings.MODEL_POLL_INTERVAL_SECONDS):
+        """Polls for newly published model versions in a background thread."""
+        if self._watcher is not None:
+            return
+
+        def watch():
+            while not self._stop_watching.wait(interval):
+                self.refresh()
+
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._stop_watching.set()
+            self._watcher.join()
+            self._watcher = None
+
+    def predict(self, travel_date: date, start_station_order: int, end_station_order: int,
+                current_bus_occupancy: float = 0.0) -> dict:
         """
         Main entry point for the API.
-        Delegates to the deterministic logic engine.
+        Uses the trained model if one is published, otherwise the deterministic logic engine.
         """
-        # Convert date to string for consistency in hashing
-        date_str = travel_date.isoformat()
-        
-        return self.calculate_deterministic_score(
-            start_seq=start_station_order,
-            end_seq=end_station_order,
-            travel_date_str=date_str,
-            travel_date_obj=travel_date
-        )
+        version, model = self._active
+
+        if model is None:
+            # Convert date to string for consistency in hashing
+            date_str = travel_date.isoformat()
+
+            result = self.calculate_deterministic_score(
+                start_seq=start_station_order,
+                end_seq=end_station_order,
+                travel_date_str=date_str,
+                travel_date_obj=travel_date
+            )
+        else:
+            result = self.calculate_model_score(
+                model, travel_date, start_station_order, end_station_order, current_bus_occupancy
+            )
+
+        result["model_version"] = version
+        return result
+
+    @staticmethod
+    def calculate_model_score(model, travel_date: date, start_seq: int, end_seq: int,
+                              current_bus_occupancy: float) -> dict:
+        """
+        Scores a request with a trained classifier (see train_model.py for the features).
+        """
+        import pandas as pd
+
+        features = pd.DataFrame([[
+            max((travel_date - date.today()).days, 0),
+            1 if travel_date.weekday() >= 5 else 0,
+            abs(end_seq - start_seq),
+            current_bus_occupancy
+        ]], columns=FEATURE_COLUMNS)
+
+        # Probability of the positive class (is_confirmed = 1)
+        proba = model.predict_proba(features)[0]
+        classes = list(model.classes_)
+        probability = float(proba[classes.index(1)]) * 100 if 1 in classes else 0.0
+
+        return {
+            "confirmation_probability": round(probability, 1),
+            "demand_level": PredictionEngine.classify(probability)
+        }
+
+    @staticmethod
+    def classify(score: float) -> str:
+        if score > 80:
+            return "High"
+        elif score > 55:
+            return "Medium"
+        return "Low"
 
     @staticmethod
     def calculate_deterministic_score(start_seq: int, end_seq: int, travel_date_str: str, travel_date_obj: date) -> dict:
@@ -77,14 +188,7 @@ class PredictionEngine:
         final_score = min(max(final_score, 10.0), 98.5)
 
         # 5. Classification
-        if final_score > 80:
-            demand = "High"
-        elif final_score > 55:
-            demand = "Medium"
-        else:
-            demand = "Low"
-
         return {
             "confirmation_probability": round(final_score, 1),
-            "demand_level": demand
+            "demand_level": PredictionEngine.classify(final_score)
         }
\ No newline at end of file
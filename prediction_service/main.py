@@ -1,10 +1,12 @@
 from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date
 from prediction_service.engine import PredictionEngine
 from common.logger import logger
+from common.profiling import install_profiling
 
 app = FastAPI(title="Demand Prediction Service")
+install_profiling(app, service="prediction-service")
 
 # Global Instance (Singleton-ish pattern for this simple app)
 prediction_engine = PredictionEngine()
@@ -13,15 +15,22 @@ prediction_engine = PredictionEngine()
 def startup_event():
     logger.info("Prediction Service Starting...")
     prediction_engine.load_model()
+    prediction_engine.start_watching()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    prediction_engine.stop_watching()
 
 class PredictionRequest(BaseModel):
     travel_date: date
     start_station_order: int 
     end_station_order: int
+    current_bus_occupancy: float = Field(default=0.0, ge=0.0, le=1.0)
 
 class PredictionResponse(BaseModel):
     confirmation_probability: float
     demand_level: str
+    model_version: str
 
 @app.post("/predict", response_model=PredictionResponse)
 def predict_demand(request: PredictionRequest):
@@ -29,7 +38,8 @@ def predict_demand(request: PredictionRequest):
         result = prediction_engine.predict(
             travel_date=request.travel_date,
             start_station_order=request.start_station_order,
-            end_station_order=request.end_station_order
+            end_station_order=request.end_station_order,
+            current_bus_occupancy=request.current_bus_occupancy
         )
         return result
     except ValueError as e:
@@ -1,8 +1,26 @@
+import sys
+import os
+
+# --- Path Setup (allows `python prediction_service/train_model.py`) ---
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(PROJECT_ROOT)
+
+import argparse
+import json
+from datetime import date, datetime, timezone
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 import joblib
 import random
+from common.config import settings
+from prediction_service.engine import FEATURE_COLUMNS
+
+HISTORY_FILE = os.path.join(settings.MODEL_DIR, "booking_history.csv")
+WATERMARK_FILE = os.path.join(settings.MODEL_DIR, "watermark.json")
+PAGE_SIZE = 1000
+# Booking IDs per status-refresh query (kept small so the `in` filter fits in the URL)
+REFRESH_BATCH_SIZE = 200
 
 def generate_mock_data(n_samples=1000):
     """
@@ -16,34 +34,201 @@ def generate_mock_data(n_samples=1000):
         is_weekend = random.choice([0, 1])
         segment_length = random.randint(1, 4) # Stations 1 to 5, max segment 4
         occupancy = random.uniform(0, 1.0) # 0 to 100% full
-        
+
         # Mock Logic for target (Probability of confirmation/high demand)
         # Closer to date + weekend + long segment -> Higher chance of confirmation being needed/high demand
         score = (30 - days_before) * 2 + (is_weekend * 20) + (segment_length * 10) + (occupancy * 10)
         # Add some noise
         score += random.randint(-10, 10)
-        
+
         is_confirmed = 1 if score > 60 else 0
-        
+
         data.append([days_before, is_weekend, segment_length, occupancy, is_confirmed])
-        
-    columns = ['days_before_travel', 'is_weekend', 'segment_length', 'current_bus_occupancy', 'is_confirmed']
+
+    columns = FEATURE_COLUMNS + ['is_confirmed']
     return pd.DataFrame(data, columns=columns)
 
-def train_and_save():
-    print("Generating mock data...")
-    df = generate_mock_data()
-    
-    X = df.drop('is_confirmed', axis=1)
+# --- Incremental Extraction ---
+def read_watermark():
+    """Returns the last run's watermark: {"created_at": ..., "run_date": ...} (empty on first run)."""
+    try:
+        with open(WATERMARK_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def write_json_atomic(path, payload):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+def get_client():
+    from supabase import create_client
+    return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+
+def fetch_new_bookings(client, since):
+    """
+    Pulls bookings created after the `since` watermark, oldest first, page by page.
+    """
+    columns = "id, seat_id, start_station_id, end_station_id, travel_date, status, created_at"
+
+    rows = []
+    while True:
+        query = client.table("bookings").select(columns).order("created_at")
+        if since:
+            query = query.gt("created_at", since)
+        page = query.range(len(rows), len(rows) + PAGE_SIZE - 1).execute().data
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            break
+
+    stations = client.table("stations").select("id, sequence_order").execute().data
+    seats = client.table("seats").select("id").execute().data
+    return rows, {s['id']: s['sequence_order'] for s in stations}, len(seats)
+
+def refresh_statuses(client, history, since_date):
+    """
+    Re-reads the status of history rows travelling on or after `since_date`.
+    The created_at watermark never revisits old rows, so without this a booking
+    cancelled after it was pulled would keep its CONFIRMED label forever.
+    Trips that had already departed at the last run can no longer change.
+    """
+    if history.empty:
+        return history
+
+    pending = history['travel_date'] >= since_date if since_date else pd.Series(True, index=history.index)
+    ids = history.loc[pending, 'id'].tolist()
+
+    statuses = {}
+    for i in range(0, len(ids), REFRESH_BATCH_SIZE):
+        batch = ids[i:i + REFRESH_BATCH_SIZE]
+        rows = client.table("bookings").select("id, status").in_("id", batch).execute().data
+        statuses.update({r['id']: r['status'] for r in rows})
+
+    refreshed = history['id'].map(statuses).fillna(history['status'])
+    changed = refreshed != history['status']
+    if changed.any():
+        history['status'] = refreshed
+        history.to_csv(HISTORY_FILE, index=False)
+    print(f"Refreshed {len(ids)} upcoming bookings ({int(changed.sum())} status changes)")
+    return history
+
+def update_history(new_rows, station_orders):
+    """
+    Appends newly pulled bookings to the local history and returns the full history.
+    Rows are stored with segment orders resolved, so features can be rebuilt offline.
+    """
+    history = pd.read_csv(HISTORY_FILE) if os.path.exists(HISTORY_FILE) else pd.DataFrame()
+
+    if new_rows:
+        new = pd.DataFrame(new_rows)
+        new['start_order'] = new['start_station_id'].map(station_orders)
+        new['end_order'] = new['end_station_id'].map(station_orders)
+        new = new.dropna(subset=['start_order', 'end_order'])
+        history = pd.concat([history, new], ignore_index=True).drop_duplicates(subset='id', keep='last')
+        history.to_csv(HISTORY_FILE, index=False)
+
+    return history
+
+# --- Feature Engineering ---
+def build_features(history, seat_count):
+    """
+    Derives the model's feature schema from raw booking rows.
+    Occupancy is the share of seats already booked for that travel date when the booking was made.
+    """
+    df = history.copy()
+    created_at = pd.to_datetime(df['created_at'], utc=True)
+    travel_date = pd.to_datetime(df['travel_date'])
+
+    booked_on = created_at.dt.tz_convert(None).dt.normalize()
+    df['days_before_travel'] = (travel_date - booked_on).dt.days.clip(lower=0)
+    df['is_weekend'] = (travel_date.dt.weekday >= 5).astype(int)
+    df['segment_length'] = (df['end_order'] - df['start_order']).abs().astype(int)
+
+    df = df.assign(_created_at=created_at).sort_values('_created_at')
+    booked_before = df.groupby('travel_date').cumcount()
+    df['current_bus_occupancy'] = np.clip(booked_before / max(seat_count, 1), 0.0, 1.0)
+
+    df['is_confirmed'] = (df['status'] == "CONFIRMED").astype(int)
+    return df[FEATURE_COLUMNS + ['is_confirmed']]
+
+# --- Training & Publishing ---
+def train(df):
+    X = df[FEATURE_COLUMNS]
     y = df['is_confirmed']
-    
-    print("Training Random Forest model...")
-    clf = RandomForestClassifier(n_estimators=100, random_state=42)
+
+    print(f"Training Random Forest model on {len(df)} rows...")
+    # n_jobs=-1 builds the trees in parallel on every core
+    clf = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
     clf.fit(X, y)
-    
-    # Save the model
-    joblib.dump(clf, 'model.pkl')
-    print("Model saved to model.pkl")
+    # n_jobs is pickled with the model; serving scores one row at a time, so don't fan out
+    clf.n_jobs = 1
+    return clf
+
+def publish(clf, rows):
+    """
+    Writes a versioned artifact, then points LATEST at it.
+    The prediction engine only ever reads complete files: LATEST is replaced atomically.
+    """
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    model_path = os.path.join(settings.MODEL_DIR, f"model-{version}.pkl")
+
+    joblib.dump(clf, f"{model_path}.tmp")
+    os.replace(f"{model_path}.tmp", model_path)
+    write_json_atomic(os.path.join(settings.MODEL_DIR, f"model-{version}.json"), {
+        "version": version,
+        "rows": rows,
+        "features": FEATURE_COLUMNS
+    })
+
+    tmp_latest = os.path.join(settings.MODEL_DIR, "LATEST.tmp")
+    with open(tmp_latest, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_latest, os.path.join(settings.MODEL_DIR, "LATEST"))
+
+    print(f"Model {version} saved to {model_path}")
+    return version
+
+def train_and_save(mock=False, full=False):
+    os.makedirs(settings.MODEL_DIR, exist_ok=True)
+
+    if mock:
+        print("Generating mock data...")
+        df = generate_mock_data()
+    else:
+        watermark = {} if full else read_watermark()
+        since = watermark.get("created_at")
+        print(f"Pulling bookings created after {since or 'the beginning'}...")
+        client = get_client()
+        new_rows, station_orders, seat_count = fetch_new_bookings(client, since)
+        print(f"Fetched {len(new_rows)} new bookings")
+
+        if full and os.path.exists(HISTORY_FILE):
+            os.remove(HISTORY_FILE)
+        history = update_history(new_rows, station_orders)
+        # A full rebuild just read every status; otherwise catch up on cancellations since the last run
+        if not full:
+            history = refresh_statuses(client, history, watermark.get("run_date"))
+
+        if history.empty or history['status'].nunique() < 2:
+            print("Not enough booking history to train (need both confirmed and cancelled bookings).")
+            return None
+        df = build_features(history, seat_count)
+
+    version = publish(train(df), len(df))
+
+    # Advance the watermark only after the model is published
+    if not mock:
+        write_json_atomic(WATERMARK_FILE, {
+            "created_at": max((r['created_at'] for r in new_rows), default=since),
+            "run_date": date.today().isoformat()
+        })
+    return version
 
 if __name__ == "__main__":
-    train_and_save()
+    parser = argparse.ArgumentParser(description="Train and publish the demand prediction model.")
+    parser.add_argument("--mock", action="store_true", help="Train on synthetic data instead of booking history")
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and rebuild history from scratch")
+    args = parser.parse_args()
+    train_and_save(mock=args.mock, full=args.full)
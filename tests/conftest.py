@@ -0,0 +1,10 @@
+import sys
+import os
+
+# --- Path Setup (tests import the services as top-level packages) ---
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(PROJECT_ROOT)
+
+# Settings require Supabase credentials; the client is created but never called
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_KEY", "test.test.test")
@@ -0,0 +1,170 @@
+import asyncio
+import types
+import pytest
+from booking_service.services import admission
+from booking_service.services.admission import AdmissionController, AdmissionRejected
+
+
+def make_controller(limit: int = 1, queue_size: int = 10, queue_timeout: float = 1.0,
+                    per_key_queue: int = 10) -> AdmissionController:
+    return AdmissionController(
+        name="test",
+        max_limit=limit,
+        min_limit=1,
+        queue_size=queue_size,
+        queue_timeout=queue_timeout,
+        per_key_queue=per_key_queue,
+        target_latency_ms=250.0
+    )
+
+
+async def settle():
+    # Let granted waiters resume
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_full_queue_is_shed_with_429():
+    async def scenario():
+        controller = make_controller(limit=1, queue_size=1)
+        admitted_at = await controller.acquire("a")
+        waiting = asyncio.ensure_future(controller.acquire("a"))
+        await settle()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("b")
+        assert rejected.value.status_code == 429
+        assert rejected.value.retry_after >= 1
+        assert controller.shed_queue_full == 1
+
+        controller.release(admitted_at)
+        controller.release(await waiting)
+
+    asyncio.run(scenario())
+
+
+def test_queue_deadline_is_shed_with_503():
+    async def scenario():
+        controller = make_controller(limit=1, queue_timeout=0.05)
+        admitted_at = await controller.acquire()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        assert rejected.value.status_code == 503
+        assert rejected.value.retry_after >= 1
+        assert controller.shed_timeout == 1
+        assert controller.queued == 0
+
+        controller.release(admitted_at)
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_fifo_within_key_and_round_robin_across_keys():
+    async def scenario():
+        controller = make_controller(limit=1)
+        admitted_at = await controller.acquire()
+        order = []
+
+        async def request(name: str, key: str):
+            granted_at = await controller.acquire(key)
+            order.append(name)
+            return granted_at
+
+        tasks = []
+        for name, key in (("a1", "a"), ("a2", "a"), ("a3", "a"), ("b1", "b")):
+            tasks.append(asyncio.ensure_future(request(name, key)))
+            await settle()
+
+        # Each release hands the slot to the next waiter; hold times don't matter here
+        for _ in tasks:
+            controller.release(admitted_at)
+            await settle()
+
+        assert order == ["a1", "b1", "a2", "a3"]
+        controller.release(admitted_at)
+        assert controller.in_flight == 0 and controller.queued == 0
+
+    asyncio.run(scenario())
+
+
+def test_slot_granted_during_timeout_is_handed_on(monkeypatch):
+    async def granted_then_timed_out(waiter, timeout):
+        await waiter
+        raise asyncio.TimeoutError
+
+    # Only the controller sees the racy wait_for
+    fake_asyncio = types.SimpleNamespace(**{**vars(asyncio), "wait_for": granted_then_timed_out})
+    monkeypatch.setattr(admission, "asyncio", fake_asyncio)
+
+    async def scenario():
+        controller = make_controller(limit=1)
+        admitted_at = await controller.acquire()
+        unlucky = asyncio.ensure_future(controller.acquire("a"))
+        await settle()
+        monkeypatch.setattr(admission, "asyncio", asyncio)
+        next_in_line = asyncio.ensure_future(controller.acquire("b"))
+        await settle()
+
+        controller.release(admitted_at)
+        await settle()
+
+        with pytest.raises(AdmissionRejected):
+            await unlucky
+        assert next_in_line.done() and not next_in_line.exception()
+        assert controller.in_flight == 1 and controller.queued == 0
+        controller.release(next_in_line.result())
+
+    asyncio.run(scenario())
+
+
+def test_high_demand_is_only_checked_behind_a_full_key_backlog():
+    async def scenario():
+        controller = make_controller(limit=1, per_key_queue=1)
+        checks = []
+
+        async def high_demand():
+            checks.append(True)
+            return True
+
+        admitted_at = await controller.acquire("hot", high_demand)
+        first = asyncio.ensure_future(controller.acquire("hot", high_demand))
+        await settle()
+        assert checks == []  # Admitted directly, then queued behind an empty backlog
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("hot", high_demand)
+        assert rejected.value.status_code == 429
+        assert controller.shed_key_full == 1 and len(checks) == 1
+
+        # Other keys still queue normally
+        other = asyncio.ensure_future(controller.acquire("cold", high_demand))
+        await settle()
+        assert controller.queued == 2
+
+        controller.release(admitted_at)
+        await settle()
+        controller.release(await first)
+        await settle()
+        controller.release(await other)
+
+    asyncio.run(scenario())
+
+
+def test_limit_adapts_to_database_latency(monkeypatch):
+    controller = make_controller(limit=8)
+    controller.min_limit = 2
+
+    monkeypatch.setattr(controller._db, "latency_ewma_ms", 1000.0)
+    controller._adapt()
+    assert controller.limit == 6
+
+    controller._last_adapt = 0.0
+    controller._adapt()
+    assert controller.limit == 4
+
+    monkeypatch.setattr(controller._db, "latency_ewma_ms", 10.0)
+    controller._last_adapt = 0.0
+    controller._adapt()
+    assert controller.limit == 5
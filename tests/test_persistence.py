@@ -0,0 +1,144 @@
+import os
+import uuid
+from datetime import date, timedelta
+import pytest
+from booking_service.schemas import Seat
+from booking_service.services.inventory import SeatInventory
+from booking_service.services.persistence import (
+    RECORD_SIZE, InventoryPersistence, WriteAheadLog, read_snapshot, write_snapshot
+)
+
+TRAVEL_DATE = date(2026, 11, 2)
+
+
+def new_id() -> str:
+    return str(uuid.uuid4())
+
+
+@pytest.fixture
+def state():
+    seats = {sid: Seat(id=sid, seat_number=number, type="sleeper")
+             for sid, number in ((new_id(), "L1"), (new_id(), "U1"))}
+    station_orders = {new_id(): 1, new_id(): 2, new_id(): 3}
+    seat_a, seat_b = seats
+    dates = {
+        TRAVEL_DATE: {seat_a: {new_id(): (1, 2), new_id(): (2, 3)}, seat_b: {new_id(): (1, 3)}},
+        date(2026, 11, 3): {},
+    }
+    return seats, station_orders, dates
+
+
+def make_inventory(seats, station_orders, dates) -> SeatInventory:
+    inventory = SeatInventory(ttl_seconds=3600)
+    inventory.import_state(dict(seats), dict(station_orders),
+                           {d: {s: dict(b) for s, b in occ.items()} for d, occ in dates.items()})
+    return inventory
+
+
+def test_snapshot_round_trip(tmp_path, state):
+    seats, station_orders, dates = state
+    path = str(tmp_path / "booking.snapshot")
+
+    write_snapshot(path, seats, station_orders, dates)
+    restored_seats, restored_orders, restored_dates = read_snapshot(path)
+
+    assert {k: (str(s.id), s.seat_number, s.type) for k, s in restored_seats.items()} == \
+        {k: (str(s.id), s.seat_number, s.type) for k, s in seats.items()}
+    assert restored_orders == station_orders
+    assert restored_dates == dates
+
+
+def test_snapshot_rejects_unknown_format(tmp_path):
+    path = tmp_path / "booking.snapshot"
+    path.write_bytes(b"XXXX" + bytes(14))
+
+    with pytest.raises(ValueError):
+        read_snapshot(str(path))
+
+
+def test_wal_replay_applies_bookings_and_releases(tmp_path, state):
+    seats, station_orders, dates = state
+    seat_a, seat_b = seats
+    released_id = next(iter(dates[TRAVEL_DATE][seat_b]))
+    booked_id = new_id()
+    path = str(tmp_path / "booking.wal")
+
+    wal = WriteAheadLog(path)
+    wal.log_booking(TRAVEL_DATE, booked_id, seat_b, 2, 3)
+    wal.log_release(TRAVEL_DATE, released_id, seat_b)
+    wal.close()
+
+    inventory = make_inventory(seats, station_orders, dates)
+    assert WriteAheadLog.replay(path, inventory) == 2
+
+    _, _, replayed = inventory.export_state()
+    assert replayed[TRAVEL_DATE][seat_b] == {booked_id: (2, 3)}
+    assert replayed[TRAVEL_DATE][seat_a] == dates[TRAVEL_DATE][seat_a]
+
+
+def test_wal_replay_ignores_torn_record(tmp_path, state):
+    seats, station_orders, dates = state
+    seat_a, seat_b = seats
+    first_id, torn_id = new_id(), new_id()
+    path = tmp_path / "booking.wal"
+
+    wal = WriteAheadLog(str(path))
+    wal.log_booking(TRAVEL_DATE, first_id, seat_b, 2, 3)
+    wal.log_booking(TRAVEL_DATE, torn_id, seat_a, 1, 2)
+    wal.close()
+    # Simulate a crash halfway through the second append
+    path.write_bytes(path.read_bytes()[:RECORD_SIZE + RECORD_SIZE // 2])
+
+    inventory = make_inventory(seats, station_orders, dates)
+    assert WriteAheadLog.replay(str(path), inventory) == 1
+
+    _, _, replayed = inventory.export_state()
+    assert first_id in replayed[TRAVEL_DATE][seat_b]
+    assert torn_id not in replayed[TRAVEL_DATE][seat_a]
+
+
+def test_wal_replay_stops_at_corrupt_record(tmp_path, state):
+    seats, station_orders, dates = state
+    seat_a, seat_b = seats
+    path = tmp_path / "booking.wal"
+
+    wal = WriteAheadLog(str(path))
+    for seat_id in (seat_a, seat_b, seat_a):
+        wal.log_booking(TRAVEL_DATE, new_id(), seat_id, 1, 2)
+    wal.close()
+    data = bytearray(path.read_bytes())
+    data[RECORD_SIZE + 5] ^= 0xFF  # Flip a byte inside the second record
+    path.write_bytes(bytes(data))
+
+    inventory = make_inventory(seats, station_orders, dates)
+    assert WriteAheadLog.replay(str(path), inventory) == 1
+
+
+def test_second_worker_restores_read_only(tmp_path, state, monkeypatch):
+    seats, station_orders, dates = state
+    seat_a, seat_b = seats
+    upcoming = date.today() + timedelta(days=3)
+    reconciled = []
+    monkeypatch.setattr(InventoryPersistence, "_reconcile", lambda self: reconciled.append(self))
+
+    owner = InventoryPersistence(
+        make_inventory(seats, station_orders, {upcoming: dates[TRAVEL_DATE]}), str(tmp_path), interval=3600
+    )
+    owner.start()
+    owner.snapshot()
+    booked_id = new_id()
+    owner.inventory.apply_booking(upcoming, booked_id, seat_b, 3, 4)  # Only in the WAL so far
+
+    files = {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path)}
+    worker = InventoryPersistence(SeatInventory(ttl_seconds=3600), str(tmp_path), interval=3600)
+    worker.start()
+    try:
+        assert worker.wal is None and worker.inventory.journal is None
+        assert reconciled == [worker]
+        _, _, restored = worker.inventory.export_state()
+        assert restored[upcoming][seat_a] == dates[TRAVEL_DATE][seat_a]
+        assert restored[upcoming][seat_b][booked_id] == (3, 4)
+    finally:
+        worker.stop()
+        assert {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path)} == files
+        owner.stop()
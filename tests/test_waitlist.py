@@ -0,0 +1,147 @@
+import uuid
+from datetime import date, timedelta
+import pytest
+from booking_service.schemas import BookingResponse, WaitlistRequest
+from booking_service.services import booking_logic
+from booking_service.services.booking_logic import BookingService
+from booking_service.services.waitlist import Waitlist
+
+TRAVEL_DATE = date.today() + timedelta(days=7)
+SEAT_ID = str(uuid.uuid4())
+
+
+def make_request(travel_date: date = TRAVEL_DATE, name: str = "Asha") -> WaitlistRequest:
+    return WaitlistRequest(
+        start_station_id=uuid.uuid4(),
+        end_station_id=uuid.uuid4(),
+        travel_date=travel_date,
+        passenger_name=name
+    )
+
+
+def always_fits(start: int, end: int) -> bool:
+    return True
+
+
+def test_pop_best_prefers_longest_segment():
+    wl = Waitlist()
+    wl.add(make_request(), (1, 2))
+    longest = wl.add(make_request(), (1, 4))
+    wl.add(make_request(), (2, 4))
+
+    assert wl.pop_best(TRAVEL_DATE, always_fits) is longest
+    assert longest.status == "PROMOTING"
+
+
+def test_pop_best_prefers_oldest_entry_on_equal_segments():
+    wl = Waitlist()
+    first = wl.add(make_request(name="first"), (1, 3))
+    second = wl.add(make_request(name="second"), (2, 4))
+
+    assert wl.pop_best(TRAVEL_DATE, always_fits) is first
+    assert wl.pop_best(TRAVEL_DATE, always_fits) is second
+    assert wl.pop_best(TRAVEL_DATE, always_fits) is None
+
+
+def test_pop_best_skips_segments_that_do_not_fit():
+    wl = Waitlist()
+    wl.add(make_request(), (1, 4))
+    short = wl.add(make_request(), (2, 3))
+
+    assert wl.pop_best(TRAVEL_DATE, lambda start, end: (start, end) == (2, 3)) is short
+    assert wl.pop_best(TRAVEL_DATE, lambda start, end: False) is None
+
+
+def test_requeue_keeps_original_priority():
+    wl = Waitlist()
+    first = wl.add(make_request(), (1, 3))
+    second = wl.add(make_request(), (1, 3))
+
+    popped = wl.pop_best(TRAVEL_DATE, always_fits)
+    assert popped is first
+    assert wl.position(second) == 1
+
+    wl.requeue(popped)
+    assert first.status == "WAITLISTED"
+    assert wl.position(first) == 1
+    assert wl.position(second) == 2
+    assert wl.pop_best(TRAVEL_DATE, always_fits) is first
+
+
+def test_past_travel_dates_are_pruned():
+    wl = Waitlist()
+    past = wl.add(make_request(travel_date=date.today() - timedelta(days=1)), (1, 2))
+    wl._pruned_on = None  # Force the daily prune on the next add
+    current = wl.add(make_request(), (1, 2))
+
+    assert wl.get(past.waitlist_id) is None
+    assert wl.get(current.waitlist_id) is current
+
+
+class FakeBerth:
+    """One seat's booked segments; stands in for the inventory and the DB insert."""
+
+    def __init__(self, waitlist: Waitlist):
+        self.waitlist = waitlist
+        self.segments = []
+        self.requested = {}
+        self.fail = False
+
+    def is_seat_free(self, seat_id, travel_date, start, end) -> bool:
+        return all(end <= s or e <= start for s, e in self.segments)
+
+    def create_booking(self, booking):
+        if self.fail:
+            raise RuntimeError("insert failed")
+        self.segments.append(self.requested[(str(booking.start_station_id), str(booking.end_station_id))])
+        return BookingResponse(booking_id=uuid.uuid4(), status="CONFIRMED", message="ok", total_amount=0.0)
+
+
+@pytest.fixture
+def berth(monkeypatch):
+    fake = FakeBerth(Waitlist())
+    monkeypatch.setattr(booking_logic, "waitlist", fake.waitlist)
+    monkeypatch.setattr(booking_logic.inventory, "is_seat_free", fake.is_seat_free)
+    monkeypatch.setattr(BookingService, "create_booking", staticmethod(fake.create_booking))
+    return fake
+
+
+def enqueue(berth: FakeBerth, segment):
+    request = make_request()
+    berth.requested[(str(request.start_station_id), str(request.end_station_id))] = segment
+    return berth.waitlist.add(request, segment)
+
+
+def test_promotion_prefers_one_long_segment(berth):
+    first = enqueue(berth, (1, 2))
+    second = enqueue(berth, (2, 3))
+    longest = enqueue(berth, (1, 3))
+
+    BookingService._promote_waitlist(SEAT_ID, TRAVEL_DATE)
+
+    # The longest segment takes the whole berth; nothing else fits afterwards
+    assert longest.status == "CONFIRMED"
+    assert first.status == second.status == "WAITLISTED"
+    assert berth.segments == [(1, 3)]
+
+
+def test_promotion_books_two_shorter_segments(berth):
+    first = enqueue(berth, (1, 2))
+    second = enqueue(berth, (2, 3))
+
+    BookingService._promote_waitlist(SEAT_ID, TRAVEL_DATE)
+
+    assert first.status == second.status == "CONFIRMED"
+    assert first.booking_id and second.booking_id
+    assert sorted(berth.segments) == [(1, 2), (2, 3)]
+
+
+def test_failed_promotion_is_requeued(berth):
+    berth.fail = True
+    entry = enqueue(berth, (1, 3))
+
+    BookingService._promote_waitlist(SEAT_ID, TRAVEL_DATE)
+
+    assert entry.status == "WAITLISTED"
+    assert entry.booking_id is None
+    assert berth.waitlist.position(entry) == 1